@@ -38,6 +38,10 @@ class BaseAgent(BaseModel, ABC):
 
     # Execution control
     max_steps: int = Field(default=10, description="Maximum steps before termination")
+    max_context_tokens: Optional[int] = Field(
+        default=None,
+        description="Token budget for memory before older turns are compacted",
+    )
     current_step: int = Field(default=0, description="Current step in execution")
 
     duplicate_threshold: int = 2
@@ -55,6 +59,10 @@ class BaseAgent(BaseModel, ABC):
             self.llm = LLM(config_name=self.name.lower())
         if not isinstance(self.memory, Memory):
             self.memory = Memory()
+        if self.memory.token_counter is None:
+            self.memory.token_counter = self.llm.count_message
+        if self.max_context_tokens and self.memory.max_tokens is None:
+            self.memory.max_tokens = self.max_context_tokens
         return self
 
     @asynccontextmanager
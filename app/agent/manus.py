@@ -6,10 +6,11 @@ from pydantic import Field
 from app.agent.toolcall import ToolCallAgent
 from app.logger import logger
 from app.prompt.manus import NEXT_STEP_PROMPT, SYSTEM_PROMPT
-from app.tool import Terminate, ToolCollection
+from app.tool import CodeSearch, Terminate, ToolCollection
 from app.tool.browser_use_tool import BrowserUseTool
 from app.tool.file_saver import FileSaver
 from app.tool.python_execute import PythonExecute
+from app.tool.web_fetch import WebFetch
 from app.tool.mysql_execute import MySqlExecute
 
 
@@ -32,11 +33,12 @@ class Manus(ToolCallAgent):
 
     max_observe: int = 2000
     max_steps: int = 20
+    max_context_tokens: int = 32000
 
     # Add general-purpose tools to the tool collection
     available_tools: ToolCollection = Field(
         default_factory=lambda: ToolCollection(
-            PythonExecute(), FileSaver(), BrowserUseTool(),Terminate()
+            PythonExecute(), FileSaver(), CodeSearch(), WebFetch(), BrowserUseTool(),Terminate()
         )
     )
 
@@ -44,6 +46,8 @@ class Manus(ToolCallAgent):
         if not self._is_special_tool(name):
             return
         else:
+            # Hand the browser context back to the pool; the browser stays up
+            # so the next task does not pay for launching it again
             await self.available_tools.get_tool(BrowserUseTool().name).cleanup()
             await super()._handle_special_tool(name, result, **kwargs)
 
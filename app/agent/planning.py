@@ -214,6 +214,9 @@ class PlanningAgent(ToolCallAgent):
             system_msgs=[Message.system_message(self.system_prompt)],
             tools=self.available_tools.to_params(),
             tool_choice=ToolChoice.AUTO,
+            tools_tokens=self.available_tools.count_param_tokens(
+                self.llm.count_tokens
+            ),
         )
         assistant_msg = Message.from_tool_calls(
             content=response.content, tool_calls=response.tool_calls
@@ -1,7 +1,9 @@
+import asyncio
 import json
-from typing import Any, List, Optional, Union
+import time
+from typing import Any, Dict, List, Optional, Union
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from app.agent.react import ReActAgent
 from app.exceptions import TokenLimitExceeded
@@ -30,10 +32,23 @@ class ToolCallAgent(ReActAgent):
 
     tool_calls: List[ToolCall] = Field(default_factory=list)
     _current_base64_image: Optional[str] = None
+    # base64 images captured per tool call id
+    _tool_images: Dict[str, str] = PrivateAttr(default_factory=dict)
+    # Tool calls dispatched while the response was still streaming
+    _pending_tools: Dict[str, asyncio.Task] = PrivateAttr(default_factory=dict)
+    _think_started: float = PrivateAttr(default=0.0)
+    _dispatch_blocked: bool = PrivateAttr(default=False)
+    # Limits parallel-safe tool runs of one step, streamed ones included
+    _tool_slots: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
 
     max_steps: int = 30
     max_observe: Optional[Union[int, bool]] = None
 
+    # Start tools while the model is still generating the remaining tool calls
+    stream_tool_calls: bool = False
+    # Maximum number of parallel-safe tool calls running at once
+    max_parallel_tools: int = 4
+
     async def think(self) -> bool:
         """Process current state and decide next actions using tools"""
         if self.next_step_prompt:
@@ -42,7 +57,7 @@ class ToolCallAgent(ReActAgent):
 
         try:
             # Get response with tool options
-            response = await self.llm.ask_tool(
+            request = dict(
                 messages=self.messages,
                 system_msgs=(
                     [Message.system_message(self.system_prompt)]
@@ -50,18 +65,31 @@ class ToolCallAgent(ReActAgent):
                     else None
                 ),
                 tools=self.available_tools.to_params(),
-                tool_choice=self.tool_choices
-
+                tool_choice=self.tool_choices,
+                tools_tokens=self.available_tools.count_param_tokens(
+                    self.llm.count_tokens
+                ),
             )
+            self._tool_slots = asyncio.Semaphore(max(1, self.max_parallel_tools))
+            if self.stream_tool_calls:
+                self._think_started = time.perf_counter()
+                self._dispatch_blocked = False
+                response = await self.llm.ask_tool_stream(
+                    on_tool_call=self._dispatch_tool_call, **request
+                )
+            else:
+                response = await self.llm.ask_tool(**request)
         except ValueError:
+            self._cancel_pending_tools()
             raise
         except Exception as e:
-            # Check if this is a RetryError containing TokenLimitExceeded
-            if hasattr(e, "__cause__") and isinstance(e.__cause__, TokenLimitExceeded):
-                token_limit_error = e.__cause__
-                logger.error(
-                    f"🚨 Token limit error (from RetryError): {token_limit_error}"
-                )
+            self._cancel_pending_tools()
+            # Check if this is TokenLimitExceeded, possibly wrapped in another error
+            token_limit_error = (
+                e if isinstance(e, TokenLimitExceeded) else getattr(e, "__cause__", None)
+            )
+            if isinstance(token_limit_error, TokenLimitExceeded):
+                logger.error(f"🚨 Token limit error: {token_limit_error}")
                 self.memory.add_message(
                     Message.assistant_message(
                         f"Maximum token limit reached, cannot continue execution: {str(token_limit_error)}"
@@ -117,6 +145,7 @@ class ToolCallAgent(ReActAgent):
 
             return bool(self.tool_calls)
         except Exception as e:
+            self._cancel_pending_tools()
             logger.error(f"🚨 Oops! The {self.name}'s thinking process hit a snag: {e}")
             self.memory.add_message(
                 Message.assistant_message(
@@ -134,13 +163,8 @@ class ToolCallAgent(ReActAgent):
             # Return last message content if no tool calls
             return self.messages[-1]
 
-        results = []
-        for command in self.tool_calls:
-            # Reset base64_image for each tool call
-            self._current_base64_image = None
-
-            result = await self.execute_tool(command)
-
+        results = await self._execute_tool_calls(self.tool_calls)
+        for command, result in zip(self.tool_calls, results):
             if self.max_observe:
                 result = result[: self.max_observe]
 
@@ -153,13 +177,51 @@ class ToolCallAgent(ReActAgent):
                 content=result,
                 tool_call_id=command.id,
                 name=command.function.name,
-                base64_image=self._current_base64_image,
+                base64_image=self._tool_images.pop(command.id, None),
             )
             self.memory.add_message(tool_msg)
-            results.append(result)
 
         return self.memory.messages[-1]
 
+    async def _execute_tool_calls(self, commands: List[ToolCall]) -> List[str]:
+        """
+        Execute tool calls, running consecutive parallel-safe calls concurrently.
+
+        Exclusive and special tools run alone, after everything before them has
+        finished. Results are returned in the original tool call order.
+        """
+        results: List[str] = [""] * len(commands)
+        batch: List[tuple[int, ToolCall]] = []
+
+        async def run(index: int, command: ToolCall) -> None:
+            # Reuse the run started while the response was streaming, if any
+            pending = self._pending_tools.pop(command.id, None)
+            if pending:
+                results[index] = await pending
+            elif self._is_exclusive_tool(command.function.name):
+                results[index] = await self.execute_tool(command)
+            else:
+                results[index] = await self._execute_limited(command)
+
+        async def run_batch() -> None:
+            if len(batch) == 1:
+                await run(*batch[0])
+            elif batch:
+                async with asyncio.TaskGroup() as group:
+                    for index, command in batch:
+                        group.create_task(run(index, command))
+            batch.clear()
+
+        for index, command in enumerate(commands):
+            if self._is_exclusive_tool(command.function.name):
+                await run_batch()
+                await run(index, command)
+            else:
+                batch.append((index, command))
+        await run_batch()
+
+        return results
+
     async def execute_tool(self, command: ToolCall) -> str:
         """Execute a single tool call with robust error handling"""
         if not command or not command.function or not command.function.name:
@@ -184,6 +246,7 @@ class ToolCallAgent(ReActAgent):
             if hasattr(result, "base64_image") and result.base64_image:
                 # Store the base64_image for later use in tool_message
                 self._current_base64_image = result.base64_image
+                self._tool_images[command.id] = result.base64_image
 
                 # Format result for display
                 observation = (
@@ -216,6 +279,38 @@ class ToolCallAgent(ReActAgent):
             logger.error(error_msg)
             return f"Error: {error_msg}"
 
+    async def _execute_limited(self, command: ToolCall) -> str:
+        """Execute a parallel-safe tool call within the max_parallel_tools limit"""
+        if self._tool_slots is None:
+            self._tool_slots = asyncio.Semaphore(max(1, self.max_parallel_tools))
+        async with self._tool_slots:
+            return await self.execute_tool(command)
+
+    def _dispatch_tool_call(self, command: ToolCall) -> None:
+        """Start a streamed tool call before the rest of the response has arrived"""
+        if self.tool_choices == ToolChoice.NONE or self._dispatch_blocked:
+            return
+        # Exclusive tools must not overlap anything, so they and every call
+        # after them still run in act()
+        if self._is_exclusive_tool(command.function.name):
+            self._dispatch_blocked = True
+            return
+
+        if not self._pending_tools:
+            logger.info(
+                f"⏱️ First tool '{command.function.name}' started "
+                f"{time.perf_counter() - self._think_started:.2f}s after request"
+            )
+        self._pending_tools[command.id] = asyncio.create_task(
+            self._execute_limited(command)
+        )
+
+    def _cancel_pending_tools(self) -> None:
+        """Cancel tool runs started from a response that failed midway"""
+        for task in self._pending_tools.values():
+            task.cancel()
+        self._pending_tools.clear()
+
     async def _handle_special_tool(self, name: str, result: Any, **kwargs):
         """Handle special tool execution and state changes"""
         if not self._is_special_tool(name):
@@ -231,6 +326,13 @@ class ToolCallAgent(ReActAgent):
         """Determine if tool execution should finish the agent"""
         return True
 
+    def _is_exclusive_tool(self, name: str) -> bool:
+        """Check if a tool must run alone, either special or declared exclusive"""
+        if self._is_special_tool(name):
+            return True
+        tool = self.available_tools.get_tool(name)
+        return bool(tool and tool.exclusive)
+
     def _is_special_tool(self, name: str) -> bool:
         """Check if tool name is in special tools list"""
         return name.lower() in [n.lower() for n in self.special_tool_names]
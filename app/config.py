@@ -32,6 +32,12 @@ class LLMSettings(BaseModel):
     temperature: float = Field(1.0, description="Sampling temperature")
     api_type: str = Field(..., description="AzureOpenai or Openai")
     api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
+    rpm: Optional[int] = Field(
+        None, description="Requests per minute quota of the endpoint (None for unlimited)"
+    )
+    tpm: Optional[int] = Field(
+        None, description="Tokens per minute quota of the endpoint (None for unlimited)"
+    )
 
 
 class ProxySettings(BaseModel):
@@ -42,6 +48,108 @@ class ProxySettings(BaseModel):
 
 class SearchSettings(BaseModel):
     engine: str = Field(default="Google", description="Search engine the llm to use")
+    timeout: float = Field(
+        10.0, description="Seconds each engine gets, retries included, to answer"
+    )
+    cache_ttl: int = Field(
+        300, description="Seconds search results are reused (0 disables the cache)"
+    )
+    cache_size: int = Field(256, description="Maximum number of cached queries")
+
+
+class WebFetchSettings(BaseModel):
+    max_connections: int = Field(
+        20, description="Maximum concurrent connections of the page fetcher"
+    )
+    per_host_connections: int = Field(
+        2, description="Maximum concurrent requests to the same host"
+    )
+    timeout: float = Field(15.0, description="Seconds allowed to fetch one page")
+    max_page_bytes: int = Field(
+        2 * 1024 * 1024, description="Bytes read from a page before it is cut off"
+    )
+    max_excerpt_chars: int = Field(
+        3000, description="Characters of text returned per page"
+    )
+    user_agent: str = Field(
+        "Mozilla/5.0 (compatible; OpenManus)",
+        description="User-Agent header sent with page requests",
+    )
+
+
+class ContentCacheSettings(BaseModel):
+    enabled: bool = Field(True, description="Whether to cache fetched web pages")
+    ttl: int = Field(
+        900, description="Seconds a cached page is used before it is revalidated"
+    )
+    max_bytes: int = Field(
+        64 * 1024 * 1024, description="Memory budget of the cached pages in bytes"
+    )
+
+
+class LLMCacheSettings(BaseModel):
+    enabled: bool = Field(False, description="Whether to cache LLM responses")
+    max_entries: int = Field(
+        512, description="Maximum number of responses kept in the in-memory LRU"
+    )
+    ttl: int = Field(
+        86400, description="Seconds before a cached response expires (0 for never)"
+    )
+    persist: bool = Field(
+        True, description="Whether to keep responses in the on-disk SQLite tier"
+    )
+    path: str = Field(
+        "cache/llm_cache.sqlite",
+        description="SQLite file for the on-disk tier, relative to the project root",
+    )
+
+
+class LLMPoolSettings(BaseModel):
+    max_connections: int = Field(
+        100, description="Maximum concurrent connections shared by all LLM clients"
+    )
+    max_keepalive_connections: int = Field(
+        20, description="Maximum idle connections kept alive in the pool"
+    )
+    keepalive_expiry: float = Field(
+        30.0, description="Seconds an idle connection is kept before closing"
+    )
+    http2: bool = Field(False, description="Whether to negotiate HTTP/2 (needs h2)")
+    connect_timeout: float = Field(10.0, description="Connect timeout in seconds")
+    read_timeout: float = Field(600.0, description="Read timeout in seconds")
+
+
+class LLMRetrySettings(BaseModel):
+    max_attempts: int = Field(6, description="Maximum attempts per LLM request")
+    max_wait: float = Field(
+        60.0, description="Maximum seconds to wait between two attempts"
+    )
+    failure_threshold: int = Field(
+        5, description="Consecutive endpoint failures before the circuit opens"
+    )
+    recovery_timeout: float = Field(
+        30.0, description="Seconds an open circuit fails fast before probing again"
+    )
+
+
+class PythonExecuteSettings(BaseModel):
+    pool_size: int = Field(2, description="Number of warm Python worker processes")
+    preload_modules: List[str] = Field(
+        default_factory=list,
+        description="Modules imported once by the forkserver and shared by all workers",
+    )
+    max_tasks_per_worker: int = Field(
+        50, description="Snippets a worker runs before it is replaced"
+    )
+    persistent: bool = Field(
+        False, description="Keep one Python namespace per agent session"
+    )
+    idle_timeout: float = Field(
+        600.0, description="Seconds before an unused persistent session is stopped"
+    )
+    memory_limit_mb: Optional[int] = Field(
+        None, description="Memory cap of a persistent session process in MB"
+    )
 
 
 class BrowserSettings(BaseModel):
@@ -67,6 +175,48 @@ class BrowserSettings(BaseModel):
     max_content_length: int = Field(
         2000, description="Maximum length for content retrieval operations"
     )
+    extract_chunk_chars: int = Field(
+        8000, description="Characters of page content per extraction LLM call"
+    )
+    extract_max_chunks: int = Field(
+        8, description="Most relevant page chunks extracted per extract_content"
+    )
+    extract_concurrency: int = Field(
+        4, description="Extraction LLM calls run at the same time"
+    )
+    max_contexts: int = Field(
+        8, description="Browser contexts (agent sessions) open at the same time"
+    )
+    context_idle_timeout: float = Field(
+        600.0, description="Seconds before an unused session's context is closed"
+    )
+    prewarm_contexts: int = Field(
+        1, description="Contexts kept ready for the next session that needs one"
+    )
+    fast_mode: bool = Field(
+        False, description="Block heavy and third-party resources while browsing"
+    )
+    block_resource_types: List[str] = Field(
+        default_factory=lambda: ["image", "media", "font"],
+        description="Playwright resource types not loaded in fast mode",
+    )
+    block_domains: List[str] = Field(
+        default_factory=lambda: [
+            "doubleclick.net",
+            "googlesyndication.com",
+            "google-analytics.com",
+            "googletagmanager.com",
+            "facebook.net",
+            "hotjar.com",
+            "scorecardresearch.com",
+            "adnxs.com",
+        ],
+        description="Domains (and their subdomains, or glob patterns) not loaded in fast mode",
+    )
+    skip_screenshots: bool = Field(
+        True,
+        description="In fast mode, skip state screenshots unless a vision model is configured",
+    )
 
 
 class AppConfig(BaseModel):
@@ -77,6 +227,24 @@ class AppConfig(BaseModel):
     search_config: Optional[SearchSettings] = Field(
         None, description="Search configuration"
     )
+    web_fetch_config: Optional[WebFetchSettings] = Field(
+        None, description="Web page fetching configuration"
+    )
+    content_cache_config: Optional[ContentCacheSettings] = Field(
+        None, description="Web page content cache configuration"
+    )
+    llm_cache_config: Optional[LLMCacheSettings] = Field(
+        None, description="LLM response cache configuration"
+    )
+    llm_pool_config: Optional[LLMPoolSettings] = Field(
+        None, description="Shared LLM HTTP connection pool configuration"
+    )
+    llm_retry_config: Optional[LLMRetrySettings] = Field(
+        None, description="LLM retry and circuit breaker configuration"
+    )
+    python_execute_config: Optional[PythonExecuteSettings] = Field(
+        None, description="Python execution worker configuration"
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -135,6 +303,8 @@ class Config:
             "temperature": base_llm.get("temperature", 1.0),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
+            "rpm": base_llm.get("rpm"),
+            "tpm": base_llm.get("tpm"),
         }
 
         # handle browser config.
@@ -175,6 +345,36 @@ class Config:
         if search_config:
             search_settings = SearchSettings(**search_config)
 
+        web_fetch_config = raw_config.get("web_fetch", {})
+        web_fetch_settings = None
+        if web_fetch_config:
+            web_fetch_settings = WebFetchSettings(**web_fetch_config)
+
+        content_cache_config = raw_config.get("content_cache", {})
+        content_cache_settings = None
+        if content_cache_config:
+            content_cache_settings = ContentCacheSettings(**content_cache_config)
+
+        llm_cache_config = raw_config.get("llm_cache", {})
+        llm_cache_settings = None
+        if llm_cache_config:
+            llm_cache_settings = LLMCacheSettings(**llm_cache_config)
+
+        llm_pool_config = raw_config.get("llm_pool", {})
+        llm_pool_settings = None
+        if llm_pool_config:
+            llm_pool_settings = LLMPoolSettings(**llm_pool_config)
+
+        llm_retry_config = raw_config.get("llm_retry", {})
+        llm_retry_settings = None
+        if llm_retry_config:
+            llm_retry_settings = LLMRetrySettings(**llm_retry_config)
+
+        python_execute_config = raw_config.get("python_execute", {})
+        python_execute_settings = None
+        if python_execute_config:
+            python_execute_settings = PythonExecuteSettings(**python_execute_config)
+
         config_dict = {
             "llm": {
                 "default": default_settings,
@@ -185,6 +385,12 @@ class Config:
             },
             "browser_config": browser_settings,
             "search_config": search_settings,
+            "web_fetch_config": web_fetch_settings,
+            "content_cache_config": content_cache_settings,
+            "llm_cache_config": llm_cache_settings,
+            "llm_pool_config": llm_pool_settings,
+            "llm_retry_config": llm_retry_settings,
+            "python_execute_config": python_execute_settings,
         }
 
         self._config = AppConfig(**config_dict)
@@ -201,5 +407,29 @@ class Config:
     def search_config(self) -> Optional[SearchSettings]:
         return self._config.search_config
 
+    @property
+    def web_fetch_config(self) -> Optional[WebFetchSettings]:
+        return self._config.web_fetch_config
+
+    @property
+    def content_cache_config(self) -> Optional[ContentCacheSettings]:
+        return self._config.content_cache_config
+
+    @property
+    def llm_cache_config(self) -> Optional[LLMCacheSettings]:
+        return self._config.llm_cache_config
+
+    @property
+    def llm_pool_config(self) -> Optional[LLMPoolSettings]:
+        return self._config.llm_pool_config
+
+    @property
+    def llm_retry_config(self) -> Optional[LLMRetrySettings]:
+        return self._config.llm_retry_config
+
+    @property
+    def python_execute_config(self) -> Optional[PythonExecuteSettings]:
+        return self._config.python_execute_config
+
 
 config = Config()
@@ -11,3 +11,11 @@ class OpenManusError(Exception):
 
 class TokenLimitExceeded(OpenManusError):
     """Exception raised when the token limit is exceeded"""
+
+
+class EmptyResponseError(OpenManusError, ValueError):
+    """Exception raised when the LLM returns an empty or invalid response"""
+
+
+class CircuitOpenError(OpenManusError):
+    """Exception raised when an LLM endpoint is failing and calls are short-circuited"""
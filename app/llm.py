@@ -1,24 +1,49 @@
+import asyncio
+import email.utils
+import functools
+import hashlib
+import json
 import math
-from typing import Dict, List, Optional, Union
-
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import httpx
 import tiktoken
 from openai import (
+    APIConnectionError,
     APIError,
+    APIStatusError,
     AsyncAzureOpenAI,
     AsyncOpenAI,
     AuthenticationError,
     OpenAIError,
     RateLimitError,
 )
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import (
+    Function as ToolCallFunction,
+)
 from tenacity import (
-    retry,
-    retry_if_exception_type,
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception,
     stop_after_attempt,
     wait_random_exponential,
 )
 
-from app.config import LLMSettings, config
-from app.exceptions import TokenLimitExceeded
+from app.config import (
+    PROJECT_ROOT,
+    LLMCacheSettings,
+    LLMPoolSettings,
+    LLMRetrySettings,
+    LLMSettings,
+    config,
+)
+from app.exceptions import CircuitOpenError, EmptyResponseError, TokenLimitExceeded
 from app.logger import logger  # Assuming a logger is set up in your app
 from app.schema import (
     ROLE_VALUES,
@@ -31,6 +56,291 @@ from app.schema import (
 
 REASONING_MODELS = ["o1", "o3-mini"]
 
+# HTTP status codes worth retrying besides 5xx
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Classify an LLM error as transient or fatal.
+
+    Rate limits, timeouts, connection failures, 5xx responses and empty
+    completions are retried. Everything else (auth failures, bad requests,
+    invalid tool_choice, token limits, ...) surfaces immediately.
+    """
+    if isinstance(error, (APIConnectionError, EmptyResponseError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return (
+            error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+        )
+    return False
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an LLM error is a 429, which the RateLimiter handles by slowing down"""
+    return isinstance(error, APIStatusError) and error.status_code == 429
+
+
+def get_retry_after(error: Optional[BaseException]) -> Optional[float]:
+    """Return the server-requested delay in seconds from Retry-After headers"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    retry_after_ms = response.headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = response.headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    After `failure_threshold` consecutive transient failures the circuit opens
+    and calls fail fast with CircuitOpenError. Once `recovery_timeout` has
+    passed, a single trial call is let through while the others keep failing
+    fast; its success closes the circuit and its failure reopens it. Rate
+    limits are left to the RateLimiter and do not count as failures.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int, recovery_timeout: float):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.recovery_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError while the endpoint is considered down"""
+        state = self.state
+        if state == "open":
+            remaining = self.recovery_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(
+                f"LLM endpoint {self.endpoint} is failing, not retrying for another {remaining:.0f}s"
+            )
+        if state == "half_open":
+            if self.trial_in_flight:
+                raise CircuitOpenError(
+                    f"LLM endpoint {self.endpoint} is failing, waiting for a trial request to succeed"
+                )
+            self.trial_in_flight = True
+
+    def after_call(self) -> None:
+        """Free the trial slot, whatever the outcome of the call"""
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            logger.warning(
+                f"Circuit opened for LLM endpoint {self.endpoint} after {self.failures} failures"
+            )
+
+
+class RateLimiter:
+    """
+    Process-wide async token bucket for a model's RPM/TPM quota.
+
+    Each request takes one request token and its estimated tokens
+    (input + max_tokens) from the buckets, waiting in FIFO order until both
+    have refilled enough. A 429 halves the refill rate and drains the buckets;
+    every accepted request then raises the rate again by a small step, so the
+    throughput settles just below the provider's real quota.
+    """
+
+    MIN_RATE_FACTOR = 0.1
+    RECOVERY_STEP = 0.05
+
+    def __init__(self, name: str, rpm: Optional[int], tpm: Optional[int]):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rate_factor = 1.0
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.rate_limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rpm or self.tpm)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for quota"""
+        return self.waiting
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            rate = self.rpm / 60 * self.rate_factor
+            self._requests = min(self.rpm, self._requests + elapsed * rate)
+        if self.tpm:
+            rate = self.tpm / 60 * self.rate_factor
+            self._tokens = min(self.tpm, self._tokens + elapsed * rate)
+
+    def _delay(self, tokens: int) -> float:
+        """Seconds until both buckets can cover the request"""
+        delay = 0.0
+        if self.rpm and self._requests < 1:
+            rate = self.rpm / 60 * self.rate_factor
+            delay = max(delay, (1 - self._requests) / rate)
+        if self.tpm and self._tokens < tokens:
+            rate = self.tpm / 60 * self.rate_factor
+            delay = max(delay, (tokens - self._tokens) / rate)
+        return delay
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until the quota allows a request of the given token size"""
+        if not self.enabled:
+            return
+        if self.tpm:
+            # A single request can never need more than a full bucket
+            tokens = min(tokens, self.tpm)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    self._refill()
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                if self.rpm:
+                    self._requests -= 1
+                if self.tpm:
+                    self._tokens -= tokens
+        finally:
+            self.waiting -= 1
+            self.total_wait += time.monotonic() - started
+
+    def refund(self, tokens: int) -> None:
+        """Give back tokens that were reserved but not used"""
+        if self.tpm and tokens > 0:
+            self._refill()
+            self._tokens = min(self.tpm, self._tokens + tokens)
+
+    def on_success(self) -> None:
+        self.rate_factor = min(1.0, self.rate_factor + self.RECOVERY_STEP)
+
+    def on_rate_limited(self) -> None:
+        if not self.enabled:
+            return
+        self.rate_limited += 1
+        self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+        self._refill()
+        self._requests = min(self._requests, 0.0)
+        self._tokens = min(self._tokens, 0.0)
+        logger.warning(
+            f"Rate limited on {self.name}, slowing down to {self.rate_factor:.0%} of quota"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limiter state and counters"""
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "rate_factor": self.rate_factor,
+            "queue_depth": self.queue_depth,
+            "total_wait": self.total_wait,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def llm_retry(func):
+    """
+    Retry an LLM call on transient errors only.
+
+    Waits honor Retry-After headers and otherwise back off exponentially.
+    Every attempt goes through the endpoint's circuit breaker, and the retry
+    count and time spent waiting are recorded per request.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self: "LLM", *args, **kwargs):
+        settings = self.retry_settings
+        breaker = self.circuit_breaker
+        backoff = wait_random_exponential(min=1, max=settings.max_wait)
+
+        def wait(retry_state: RetryCallState) -> float:
+            retry_after = get_retry_after(retry_state.outcome.exception())
+            if retry_after is not None:
+                return min(retry_after, settings.max_wait)
+            return backoff(retry_state)
+
+        def before_sleep(retry_state: RetryCallState) -> None:
+            logger.warning(
+                f"Retrying {func.__name__} in {retry_state.next_action.sleep:.1f}s "
+                f"after attempt {retry_state.attempt_number} failed: {retry_state.outcome.exception()}"
+            )
+
+        retrying = AsyncRetrying(
+            wait=wait,
+            stop=stop_after_attempt(settings.max_attempts),
+            retry=retry_if_exception(is_retryable_error),
+            before_sleep=before_sleep,
+            reraise=True,
+        )
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    breaker.before_call()
+                    try:
+                        result = await func(self, *args, **kwargs)
+                    except Exception as e:
+                        if is_retryable_error(e) and not is_rate_limit_error(e):
+                            breaker.record_failure()
+                        raise
+                    else:
+                        breaker.record_success()
+                    finally:
+                        breaker.after_call()
+        finally:
+            self._record_retries(func.__name__, retrying.statistics)
+        return result
+
+    return wrapper
+
 
 class TokenCounter:
     # Token constants
@@ -44,8 +354,15 @@ class TokenCounter:
     HIGH_DETAIL_TARGET_SHORT_SIDE = 768
     TILE_SIZE = 512
 
+    # Per-message cache constants
+    MESSAGE_CACHE_SIZE = 4096
+
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
+        # Message fingerprint -> token count, so history is only tokenized once
+        self._message_cache: "OrderedDict[tuple, int]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def count_text(self, text: str) -> int:
         """Calculate tokens for a text string"""
@@ -141,35 +458,324 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
-    def count_message_tokens(self, messages: List[dict]) -> int:
-        """Calculate the total number of tokens in a message list"""
-        total_tokens = self.FORMAT_TOKENS  # Base format tokens
+    @staticmethod
+    def _text_key(text: Any) -> tuple:
+        # str caches its hash, so strings kept in the history are only hashed once
+        return (len(text), hash(text)) if isinstance(text, str) else (0, 0)
 
-        for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+    @classmethod
+    def _message_key(cls, message: dict) -> tuple:
+        """
+        Build a fingerprint of the parts of a formatted message that are counted.
+
+        Images are keyed by their detail and dimensions only, since their token
+        cost does not depend on the payload, so base64 data is never read.
+        """
+        content = message.get("content")
+        if isinstance(content, list):
+            parts = []
+            for item in content:
+                if isinstance(item, str):
+                    parts.append(cls._text_key(item))
+                elif isinstance(item, dict):
+                    if "text" in item:
+                        parts.append(cls._text_key(item["text"]))
+                    elif "image_url" in item:
+                        dimensions = item.get("dimensions")
+                        parts.append(
+                            (
+                                "image",
+                                item.get("detail", "medium"),
+                                tuple(dimensions) if dimensions else None,
+                            )
+                        )
+            content_key = tuple(parts)
+        else:
+            content_key = cls._text_key(content)
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
+        tool_calls_key = tuple(
+            (
+                cls._text_key(tool_call["function"].get("name", "")),
+                cls._text_key(tool_call["function"].get("arguments", "")),
+            )
+            for tool_call in message.get("tool_calls") or []
+            if "function" in tool_call
+        )
+        return (
+            cls._text_key(message.get("role", "")),
+            content_key,
+            tool_calls_key,
+            cls._text_key(message.get("name", "")),
+            cls._text_key(message.get("tool_call_id", "")),
+        )
+
+    def _count_single_message(self, message: dict) -> int:
+        """Calculate tokens for one message without consulting the cache"""
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
+
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
+        return tokens
+
+    def count_single_message(self, message: dict) -> int:
+        """
+        Calculate tokens for one message, reusing the cached count when the same
+        content has been seen before. Only new messages hit the tokenizer, so the
+        per-turn cost stays flat as the conversation history grows.
+        """
+        key = self._message_key(message)
+        cached = self._message_cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            self._message_cache.move_to_end(key)
+            return cached
+
+        self.cache_misses += 1
+        tokens = self._count_single_message(message)
+        self._message_cache[key] = tokens
+        if len(self._message_cache) > self.MESSAGE_CACHE_SIZE:
+            self._message_cache.popitem(last=False)
+        return tokens
+
+    def count_message_tokens(self, messages: List[dict]) -> int:
+        """Calculate the total number of tokens in a message list"""
+        total_tokens = self.FORMAT_TOKENS  # Base format tokens
 
-            total_tokens += tokens
+        for message in messages:
+            total_tokens += self.count_single_message(message)
 
         return total_tokens
 
+    def clear_cache(self) -> None:
+        """Drop all cached per-message token counts"""
+        self._message_cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class ResponseCache:
+    """
+    Exact-match cache for LLM responses.
+
+    Entries are keyed on the canonicalized request (model, messages, tools,
+    tool_choice, temperature, ...) and kept in an in-memory LRU backed by an
+    optional SQLite tier that survives restarts. Both tiers honor the TTL.
+
+    SQLite is only touched from a single background thread: reads that miss
+    memory are awaited there, and writes are queued to it without waiting,
+    so disk I/O never blocks the event loop.
+    """
+
+    def __init__(self, settings: LLMCacheSettings):
+        self.max_entries = settings.max_entries
+        self.ttl = settings.ttl
+        self._memory: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if settings.persist:
+            db_path = PROJECT_ROOT / settings.path
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._db_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="llm-cache"
+            )
+
+    @staticmethod
+    def make_key(**request: Any) -> str:
+        """Build a stable hash from the request parameters"""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl) and time.time() - created > self.ttl
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+        if self._db is not None:
+            entry = await asyncio.get_running_loop().run_in_executor(
+                self._db_executor, self._read, key
+            )
+            if entry is not None:
+                created, value = entry
+                with self._lock:
+                    self._remember(key, created, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value under key"""
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, value)
+        if self._db is not None:
+            self._db_executor.submit(self._write, key, value, created)
+
+    def _read(self, key: str) -> Optional[tuple[float, Any]]:
+        """Load an unexpired entry from SQLite; runs on the database thread"""
+        try:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1]):
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            return row[1], json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Failed to read the LLM response cache: {e}")
+            return None
+
+    def _write(self, key: str, value: Any, created: float) -> None:
+        """Persist an entry to SQLite; runs on the database thread"""
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), created),
+            )
+            self._db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write the LLM response cache: {e}")
+
+    def _remember(self, key: str, created: float, value: Any) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached responses from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            self._db_executor.submit(self._clear_db)
+
+    def _clear_db(self) -> None:
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters"""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._memory),
+        }
+
+
+class PooledTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that records connection pool usage for all LLM clients."""
+
+    def __init__(self, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self.max_connections = max_connections
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight > self.max_connections:
+            # This request has to wait for a pooled connection to free up
+            self.saturated += 1
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return pool saturation counters"""
+        connections = getattr(self._pool, "connections", [])
+        return {
+            "max_connections": self.max_connections,
+            "connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "requests": self.requests,
+            "saturated": self.saturated,
+        }
+
+
+def _create_http_client(settings: LLMPoolSettings) -> httpx.AsyncClient:
+    """Build the HTTP client shared by every LLM instance"""
+    http2 = settings.http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested for LLM pool but `h2` is not installed")
+            http2 = False
+
+    transport = PooledTransport(
+        max_connections=settings.max_connections,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            settings.read_timeout,
+            connect=settings.connect_timeout,
+        ),
+        follow_redirects=True,
+    )
+
 
 class LLM:
     _instances: Dict[str, "LLM"] = {}
+    _response_cache: Optional[ResponseCache] = None
+    _http_client: Optional[httpx.AsyncClient] = None
+    _circuit_breakers: Dict[str, CircuitBreaker] = {}
+    _rate_limiters: Dict[str, RateLimiter] = {}
 
     def __new__(
         cls, config_name: str = "default", llm_config: Optional[LLMSettings] = None
@@ -209,16 +815,121 @@ class LLM:
                 # If the model is not in tiktoken's presets, use cl100k_base as default
                 self.tokenizer = tiktoken.get_encoding("cl100k_base")
 
+            http_client = self.get_http_client()
             if self.api_type == "azure":
                 self.client = AsyncAzureOpenAI(
                     base_url=self.base_url,
                     api_key=self.api_key,
                     api_version=self.api_version,
+                    http_client=http_client,
                 )
             else:
-                self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+                self.client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    http_client=http_client,
+                )
 
             self.token_counter = TokenCounter(self.tokenizer)
+            self.last_stream_metrics: Dict[str, float] = {}
+
+            self.retry_settings = config.llm_retry_config or LLMRetrySettings()
+            if self.base_url not in LLM._circuit_breakers:
+                LLM._circuit_breakers[self.base_url] = CircuitBreaker(
+                    self.base_url,
+                    self.retry_settings.failure_threshold,
+                    self.retry_settings.recovery_timeout,
+                )
+            self.circuit_breaker = LLM._circuit_breakers[self.base_url]
+
+            limiter_key = f"{self.base_url}|{self.model}"
+            if limiter_key not in LLM._rate_limiters:
+                LLM._rate_limiters[limiter_key] = RateLimiter(
+                    self.model, llm_config.rpm, llm_config.tpm
+                )
+            self.rate_limiter = LLM._rate_limiters[limiter_key]
+            self.retry_stats = {"requests": 0, "retries": 0, "retry_wait": 0.0}
+            self.last_retry_stats: Dict[str, float] = {}
+
+            cache_config = config.llm_cache_config
+            if (
+                cache_config
+                and cache_config.enabled
+                and LLM._response_cache is None
+            ):
+                LLM._response_cache = ResponseCache(cache_config)
+
+    @classmethod
+    def get_http_client(cls) -> httpx.AsyncClient:
+        """Return the pooled HTTP client shared by all LLM instances"""
+        if cls._http_client is None:
+            cls._http_client = _create_http_client(
+                config.llm_pool_config or LLMPoolSettings()
+            )
+        return cls._http_client
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, int]:
+        """Return connection pool usage of the shared HTTP client"""
+        if cls._http_client is None:
+            return {}
+        return cls._http_client._transport.stats()
+
+    async def _create_completion(self, params: dict, input_tokens: int):
+        """
+        Send a chat completion request through the model's rate limiter.
+
+        The request is charged with its input tokens plus max_tokens; unused
+        completion tokens are refunded once the usage is known.
+        """
+        await self.rate_limiter.acquire(input_tokens + self.max_tokens)
+        try:
+            response = await self.client.chat.completions.create(**params)
+        except RateLimitError:
+            self.rate_limiter.on_rate_limited()
+            raise
+        self.rate_limiter.on_success()
+
+        usage = getattr(response, "usage", None)
+        if usage is not None and usage.completion_tokens is not None:
+            self.rate_limiter.refund(self.max_tokens - usage.completion_tokens)
+        return response
+
+    def _record_retries(self, name: str, statistics: Dict[str, Any]) -> None:
+        """Record how many retries a request needed and how long it waited"""
+        retries = max(0, statistics.get("attempt_number", 1) - 1)
+        waited = statistics.get("idle_for", 0.0)
+        self.last_retry_stats = {"retries": retries, "retry_wait": waited}
+        self.retry_stats["requests"] += 1
+        self.retry_stats["retries"] += retries
+        self.retry_stats["retry_wait"] += waited
+        if retries:
+            logger.info(f"{name} needed {retries} retries, waited {waited:.1f}s")
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """The process-wide response cache, if one is configured"""
+        return LLM._response_cache
+
+    def _cache_key(
+        self, use_cache: Optional[bool], temperature: Optional[float], **request
+    ) -> Optional[str]:
+        """
+        Return the cache key for a request, or None if the cache should not be used.
+
+        Responses are only reused for deterministic (temperature 0) requests
+        unless the caller explicitly passes use_cache=True.
+        """
+        if self.response_cache is None or use_cache is False:
+            return None
+        if not use_cache and temperature != 0:
+            return None
+        return ResponseCache.make_key(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=temperature,
+            **request,
+        )
 
     def count_tokens(self, text: str) -> int:
         """Calculate the number of tokens in a text"""
@@ -229,6 +940,13 @@ class LLM:
     def count_message_tokens(self, messages: List[dict]) -> int:
         return self.token_counter.count_message_tokens(messages)
 
+    def count_message(self, message: Union[dict, Message]) -> int:
+        """Calculate the tokens a single message adds to a request"""
+        return sum(
+            self.token_counter.count_single_message(formatted)
+            for formatted in self.format_messages([message])
+        )
+
     def update_token_count(self, input_tokens: int) -> None:
         """Update token counts"""
         # Only track tokens if max_input_tokens is set
@@ -335,19 +1053,14 @@ class LLM:
 
         return formatted_messages
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    @llm_retry
     async def ask(
         self,
         messages: List[Union[dict, Message]],
         system_msgs: Optional[List[Union[dict, Message]]] = None,
         stream: bool = True,
         temperature: Optional[float] = None,
+        use_cache: Optional[bool] = None,
     ) -> str:
         """
         Send a prompt to the LLM and get the response.
@@ -357,6 +1070,7 @@ class LLM:
             system_msgs: Optional system messages to prepend
             stream (bool): Whether to stream the response
             temperature (float): Sampling temperature for the response
+            use_cache (bool): Reuse cached responses even when temperature is not 0 (False disables the cache)
 
         Returns:
             str: The generated response
@@ -375,6 +1089,17 @@ class LLM:
             else:
                 messages = self.format_messages(messages)
 
+            if self.model not in REASONING_MODELS:
+                temperature = (
+                    temperature if temperature is not None else self.temperature
+                )
+            cache_key = self._cache_key(use_cache, temperature, messages=messages)
+            if cache_key:
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("LLM response served from cache")
+                    return cached
+
             # Calculate input token count
             input_tokens = self.count_message_tokens(messages)
 
@@ -393,29 +1118,31 @@ class LLM:
                 params["max_completion_tokens"] = self.max_tokens
             else:
                 params["max_tokens"] = self.max_tokens
-                params["temperature"] = (
-                    temperature if temperature is not None else self.temperature
-                )
+                params["temperature"] = temperature
 
             if not stream:
                 # Non-streaming request
                 params["stream"] = False
 
-                response = await self.client.chat.completions.create(**params)
+                response = await self._create_completion(params, input_tokens)
 
                 if not response.choices or not response.choices[0].message.content:
-                    raise ValueError("Empty or invalid response from LLM")
+                    raise EmptyResponseError("Empty or invalid response from LLM")
 
                 # Update token counts
                 self.update_token_count(response.usage.prompt_tokens)
 
+                if cache_key:
+                    self.response_cache.set(
+                        cache_key, response.choices[0].message.content
+                    )
                 return response.choices[0].message.content
 
             # Streaming request, For streaming, update estimated token count before making the request
             self.update_token_count(input_tokens)
 
             params["stream"] = True
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(params, input_tokens)
 
             collected_messages = []
             async for chunk in response:
@@ -426,8 +1153,10 @@ class LLM:
             print()  # Newline after streaming
             full_response = "".join(collected_messages).strip()
             if not full_response:
-                raise ValueError("Empty response from streaming LLM")
+                raise EmptyResponseError("Empty response from streaming LLM")
 
+            if cache_key:
+                self.response_cache.set(cache_key, full_response)
             return full_response
 
         except TokenLimitExceeded:
@@ -449,13 +1178,7 @@ class LLM:
             logger.error(f"Unexpected error in ask: {e}")
             raise
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    @llm_retry
     async def ask_with_images(
         self,
         messages: List[Union[dict, Message]],
@@ -551,17 +1274,17 @@ class LLM:
 
             # Handle non-streaming request
             if not stream:
-                response = await self.client.chat.completions.create(**params)
+                response = await self._create_completion(params, input_tokens)
 
                 if not response.choices or not response.choices[0].message.content:
-                    raise ValueError("Empty or invalid response from LLM")
+                    raise EmptyResponseError("Empty or invalid response from LLM")
 
                 self.update_token_count(response.usage.prompt_tokens)
                 return response.choices[0].message.content
 
             # Handle streaming request
             self.update_token_count(input_tokens)
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(params, input_tokens)
 
             collected_messages = []
             async for chunk in response:
@@ -573,7 +1296,7 @@ class LLM:
             full_response = "".join(collected_messages).strip()
 
             if not full_response:
-                raise ValueError("Empty response from streaming LLM")
+                raise EmptyResponseError("Empty response from streaming LLM")
 
             return full_response
 
@@ -595,13 +1318,7 @@ class LLM:
             logger.error(f"Unexpected error in ask_with_images: {e}")
             raise
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    @llm_retry
     async def ask_tool(
         self,
         messages: List[Union[dict, Message]],
@@ -610,6 +1327,8 @@ class LLM:
         tools: Optional[List[dict]] = None,
         tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
         temperature: Optional[float] = None,
+        tools_tokens: Optional[int] = None,
+        use_cache: Optional[bool] = None,
         **kwargs,
     ):
         """
@@ -622,6 +1341,8 @@ class LLM:
             tools: List of tools to use
             tool_choice: Tool choice strategy
             temperature: Sampling temperature for the response
+            tools_tokens: Precomputed token cost of `tools`, e.g. from ToolCollection.count_param_tokens
+            use_cache: Reuse cached responses even when temperature is not 0 (False disables the cache)
             **kwargs: Additional completion arguments
 
         Returns:
@@ -645,14 +1366,35 @@ class LLM:
             else:
                 messages = self.format_messages(messages)
 
+            if self.model not in REASONING_MODELS:
+                temperature = (
+                    temperature if temperature is not None else self.temperature
+                )
+            cache_key = self._cache_key(
+                use_cache,
+                temperature,
+                messages=messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                **kwargs,
+            )
+            if cache_key:
+                cached = await self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("LLM tool response served from cache")
+                    return ChatCompletionMessage.model_validate(cached)
+
             # Calculate input token count
             input_tokens = self.count_message_tokens(messages)
 
-            # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
+            # If there are tools and no precomputed budget, count their JSON wire form
+            if tools_tokens is None:
+                tools_tokens = 0
+                if tools:
+                    for tool in tools:
+                        tools_tokens += self.count_tokens(
+                            json.dumps(tool, ensure_ascii=False)
+                        )
 
             input_tokens += tools_tokens
 
@@ -682,20 +1424,22 @@ class LLM:
                 params["max_completion_tokens"] = self.max_tokens
             else:
                 params["max_tokens"] = self.max_tokens
-                params["temperature"] = (
-                    temperature if temperature is not None else self.temperature
-                )
+                params["temperature"] = temperature
 
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(params, input_tokens)
 
             # Check if response is valid
             if not response.choices or not response.choices[0].message:
                 print(response)
-                raise ValueError("Invalid or empty response from LLM")
+                raise EmptyResponseError("Invalid or empty response from LLM")
 
             # Update token counts
             self.update_token_count(response.usage.prompt_tokens)
 
+            if cache_key:
+                self.response_cache.set(
+                    cache_key, response.choices[0].message.model_dump()
+                )
             return response.choices[0].message
 
         except TokenLimitExceeded:
@@ -716,3 +1460,194 @@ class LLM:
         except Exception as e:
             logger.error(f"Unexpected error in ask_tool: {e}")
             raise
+
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 3000,
+        tools: Optional[List[dict]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        tools_tokens: Optional[int] = None,
+        on_tool_call: Optional[Callable[[ChatCompletionMessageToolCall], Any]] = None,
+        **kwargs,
+    ) -> ChatCompletionMessage:
+        """
+        Streaming variant of ask_tool that hands over tool calls as soon as they are complete.
+
+        Tool call deltas are assembled incrementally; once a call's JSON arguments
+        parse (or the next call starts), it is passed to `on_tool_call` while the
+        model is still generating the remaining calls. Unlike ask_tool this method
+        is not retried, since the callback may already have started tools.
+
+        Args:
+            messages: List of conversation messages
+            system_msgs: Optional system messages to prepend
+            timeout: Request timeout in seconds
+            tools: List of tools to use
+            tool_choice: Tool choice strategy
+            temperature: Sampling temperature for the response
+            tools_tokens: Precomputed token cost of `tools`, e.g. from ToolCollection.count_param_tokens
+            on_tool_call: Called with each tool call as soon as its arguments are complete
+            **kwargs: Additional completion arguments
+
+        Returns:
+            ChatCompletionMessage: The assembled response with all tool calls
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            ValueError: If tools, tool_choice, or messages are invalid
+            OpenAIError: If API call fails
+        """
+        try:
+            # Validate tool_choice
+            if tool_choice not in TOOL_CHOICE_VALUES:
+                raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+            # Format messages
+            if system_msgs:
+                system_msgs = self.format_messages(system_msgs)
+                messages = system_msgs + self.format_messages(messages)
+            else:
+                messages = self.format_messages(messages)
+
+            # Calculate input token count
+            input_tokens = self.count_message_tokens(messages)
+            if tools_tokens is None:
+                tools_tokens = 0
+                if tools:
+                    for tool in tools:
+                        tools_tokens += self.count_tokens(
+                            json.dumps(tool, ensure_ascii=False)
+                        )
+            input_tokens += tools_tokens
+
+            # Check if token limits are exceeded
+            if not self.check_token_limit(input_tokens):
+                raise TokenLimitExceeded(self.get_limit_error_message(input_tokens))
+
+            # Validate tools if provided
+            if tools:
+                for tool in tools:
+                    if not isinstance(tool, dict) or "type" not in tool:
+                        raise ValueError("Each tool must be a dict with 'type' field")
+
+            params = {
+                "model": self.model,
+                "messages": messages,
+                "tools": tools,
+                "tool_choice": tool_choice,
+                "timeout": timeout,
+                "stream": True,
+                **kwargs,
+            }
+
+            if self.model in REASONING_MODELS:
+                params["max_completion_tokens"] = self.max_tokens
+            else:
+                params["max_tokens"] = self.max_tokens
+                params["temperature"] = (
+                    temperature if temperature is not None else self.temperature
+                )
+
+            # For streaming, update estimated token count before making the request
+            self.update_token_count(input_tokens)
+
+            started = time.perf_counter()
+            self.last_stream_metrics = {}
+            content_parts: List[str] = []
+            # Partial tool calls by stream index
+            partial_calls: Dict[int, Dict[str, str]] = {}
+            completed: Dict[int, ChatCompletionMessageToolCall] = {}
+
+            def complete(index: int) -> None:
+                if index in completed:
+                    return
+                partial = partial_calls[index]
+                call = ChatCompletionMessageToolCall(
+                    id=partial["id"],
+                    type="function",
+                    function=ToolCallFunction(
+                        name=partial["name"], arguments=partial["arguments"]
+                    ),
+                )
+                completed[index] = call
+                if not self.last_stream_metrics:
+                    self.last_stream_metrics["time_to_first_tool_call"] = (
+                        time.perf_counter() - started
+                    )
+                if on_tool_call:
+                    on_tool_call(call)
+
+            response = await self._create_completion(params, input_tokens)
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+
+                for tool_delta in delta.tool_calls or []:
+                    index = tool_delta.index
+                    # A new call starting means all earlier calls are complete
+                    for earlier in list(partial_calls):
+                        if earlier < index:
+                            complete(earlier)
+
+                    partial = partial_calls.setdefault(
+                        index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    if tool_delta.id:
+                        partial["id"] = tool_delta.id
+                    if tool_delta.function:
+                        if tool_delta.function.name:
+                            partial["name"] += tool_delta.function.name
+                        if tool_delta.function.arguments:
+                            partial["arguments"] += tool_delta.function.arguments
+
+                    arguments = partial["arguments"].rstrip()
+                    if index not in completed and arguments.endswith("}"):
+                        try:
+                            json.loads(arguments)
+                        except json.JSONDecodeError:
+                            continue
+                        complete(index)
+
+            for index in sorted(partial_calls):
+                complete(index)
+
+            self.last_stream_metrics["total"] = time.perf_counter() - started
+            if "time_to_first_tool_call" in self.last_stream_metrics:
+                logger.info(
+                    f"Streamed {len(completed)} tool calls, first ready after "
+                    f"{self.last_stream_metrics['time_to_first_tool_call']:.2f}s "
+                    f"of {self.last_stream_metrics['total']:.2f}s"
+                )
+
+            content = "".join(content_parts) or None
+            tool_calls = [completed[index] for index in sorted(completed)]
+            if not content and not tool_calls:
+                raise EmptyResponseError("Empty response from streaming LLM")
+
+            return ChatCompletionMessage(
+                role="assistant", content=content, tool_calls=tool_calls or None
+            )
+
+        except TokenLimitExceeded:
+            raise
+        except ValueError as ve:
+            logger.error(f"Validation error in ask_tool_stream: {ve}")
+            raise
+        except OpenAIError as oe:
+            logger.error(f"OpenAI API error: {oe}")
+            if isinstance(oe, AuthenticationError):
+                logger.error("Authentication failed. Check API key.")
+            elif isinstance(oe, RateLimitError):
+                logger.error("Rate limit exceeded. Consider increasing retry attempts.")
+            elif isinstance(oe, APIError):
+                logger.error(f"API error: {oe}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in ask_tool_stream: {e}")
+            raise
@@ -6,9 +6,13 @@ PythonExecute: Execute Python code to interact with the computer system, data pr
 
 FileSaver: Save files locally, such as txt, py, html, etc.
 
+CodeSearch: Search the contents of the files in the workspace by text or regular expression.
+
 MysqlExecute: execute sql from local db with table like  `fruit_sell_data` (`id`, `goodsName`,`shopName`,`sellNum`).
 
 
+WebFetch: Read several web pages at once, or search the web and read the top results in one step. Prefer it over BrowserUseTool when you only need the text of pages.
+
 BrowserUseTool: Open, browse, and use web browsers. If you open a local HTML file, you must provide the absolute path to the file.
 
 Terminate: End the current interaction when the task is complete or when you need additional information from the user. Use this tool to signal that you've finished addressing the user's request or need clarification before proceeding further.
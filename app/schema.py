@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import Any, List, Literal, Optional, Union
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class Role(str, Enum):
@@ -156,24 +156,177 @@ class Message(BaseModel):
         )
 
 
+COMPACTION_SUMMARY_PREFIX = "[Summary of earlier steps, compacted to save context]"
+
+
 class Memory(BaseModel):
     messages: List[Message] = Field(default_factory=list)
     max_messages: int = Field(default=100)
+    max_tokens: Optional[int] = Field(
+        default=None, description="Token budget before older turns are compacted"
+    )
+    max_summary_chars: int = Field(default=4000)
+    token_counter: Optional[Callable[[Message], int]] = Field(
+        default=None, exclude=True
+    )
+    # id(message) -> (message, tokens); holding the message keeps the id valid
+    _token_cache: Dict[int, Tuple[Message, int]] = PrivateAttr(default_factory=dict)
 
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
         self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self.compact()
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
         self.messages.extend(messages)
+        self.compact()
+
+    def count_tokens(self) -> int:
+        """Calculate the tokens currently held in memory"""
+        return sum(self._count(message) for message in self.messages)
+
+    def _count(self, message: Message) -> int:
+        cached = self._token_cache.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        counter = self.token_counter or self.estimate_tokens
+        tokens = counter(message)
+        self._token_cache[id(message)] = (message, tokens)
+        return tokens
+
+    @staticmethod
+    def estimate_tokens(message: Message) -> int:
+        """Rough token estimate used when no tokenizer-backed counter is set"""
+        text = message.content or ""
+        if message.tool_calls:
+            text += "".join(
+                call.function.name + call.function.arguments
+                for call in message.tool_calls
+            )
+        return 4 + len(text) // 4
+
+    @staticmethod
+    def _is_summary(message: Message) -> bool:
+        return bool(message.content) and message.content.startswith(
+            COMPACTION_SUMMARY_PREFIX
+        )
+
+    @staticmethod
+    def _group_turns(messages: List[Message]) -> List[List[Message]]:
+        """Group an assistant tool_calls message with its tool results"""
+        turns: List[List[Message]] = []
+        for message in messages:
+            if (
+                message.role == Role.TOOL
+                and turns
+                and turns[-1][0].tool_calls
+                and message.tool_call_id
+                in {call.id for call in turns[-1][0].tool_calls}
+            ):
+                turns[-1].append(message)
+            else:
+                turns.append([message])
+        return turns
+
+    def _exceeds(self, count: int, tokens: int) -> bool:
+        if count > self.max_messages:
+            return True
+        return self.max_tokens is not None and tokens > self.max_tokens
+
+    def _summarize(
+        self, summary: Optional[Message], dropped: List[Message]
+    ) -> Message:
+        """Fold dropped messages into an extractive summary message"""
+        lines = (
+            summary.content.split("\n")[1:] if summary and summary.content else []
+        )
+        seen = set(lines)
+
+        def snippet(text: str, limit: int = 150) -> str:
+            text = " ".join(text.split())
+            return text if len(text) <= limit else text[:limit] + "..."
+
+        for message in dropped:
+            new_lines = []
+            if message.role == Role.TOOL:
+                new_lines.append(
+                    f"- {message.name or 'tool'} returned: {snippet(message.content or '')}"
+                )
+            else:
+                if message.content:
+                    new_lines.append(f"- {message.role}: {snippet(message.content)}")
+                for call in message.tool_calls or []:
+                    new_lines.append(
+                        f"- {message.role} called {call.function.name}({snippet(call.function.arguments, 100)})"
+                    )
+            for line in new_lines:
+                if line not in seen:
+                    seen.add(line)
+                    lines.append(line)
+
+        # Keep the most recent lines when the summary grows too long
+        while lines and sum(len(line) + 1 for line in lines) > self.max_summary_chars:
+            lines.pop(0)
+        return Message.user_message("\n".join([COMPACTION_SUMMARY_PREFIX] + lines))
+
+    def compact(self) -> None:
+        """
+        Drop the oldest turns once the message or token limit is exceeded.
+
+        The first user request is kept, an assistant tool_calls message is never
+        separated from its tool results, and dropped turns are folded into a
+        single extractive summary message placed after the request.
+        """
+        counter = self._count
+
+        rest = self.messages
+        head: List[Message] = []
+        if rest and rest[0].role == Role.USER and not self._is_summary(rest[0]):
+            head, rest = rest[:1], rest[1:]
+        summary: Optional[Message] = None
+        if rest and self._is_summary(rest[0]):
+            summary, rest = rest[0], rest[1:]
+
+        count = len(self.messages)
+        if count <= self.max_messages and self.max_tokens is None:
+            return
+
+        turns = self._group_turns(rest)
+        turn_tokens = [sum(counter(message) for message in turn) for turn in turns]
+        tokens = sum(counter(message) for message in head) + sum(turn_tokens)
+        summary_tokens = counter(summary) if summary else 0
+        if not self._exceeds(count, tokens + summary_tokens):
+            return
+
+        compacted = False
+        # Always keep the latest turn, and never start with orphaned tool results
+        while len(turns) > 1 and (
+            self._exceeds(count, tokens + summary_tokens)
+            or turns[0][0].role == Role.TOOL
+        ):
+            turn = turns.pop(0)
+            tokens -= turn_tokens.pop(0)
+            count -= len(turn)
+            if summary is None:
+                count += 1
+            summary = self._summarize(summary, turn)
+            summary_tokens = counter(summary)
+            compacted = True
+
+        if compacted:
+            self.messages = (
+                head + [summary] + [message for turn in turns for message in turn]
+            )
+            kept = {id(message) for message in self.messages}
+            self._token_cache = {
+                key: value for key, value in self._token_cache.items() if key in kept
+            }
 
     def clear(self) -> None:
         """Clear all messages"""
         self.messages.clear()
+        self._token_cache.clear()
 
     def get_recent_messages(self, n: int) -> List[Message]:
         """Get n most recent messages"""
@@ -1,5 +1,6 @@
 from app.tool.base import BaseTool
 from app.tool.bash import Bash
+from app.tool.code_search import CodeSearch
 from app.tool.create_chat_completion import CreateChatCompletion
 from app.tool.planning import PlanningTool
 from app.tool.str_replace_editor import StrReplaceEditor
@@ -10,6 +11,7 @@ from app.tool.tool_collection import ToolCollection
 __all__ = [
     "BaseTool",
     "Bash",
+    "CodeSearch",
     "Terminate",
     "StrReplaceEditor",
     "ToolCollection",
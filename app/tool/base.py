@@ -8,6 +8,8 @@ class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    # Exclusive tools never run concurrently with other tool calls
+    exclusive: bool = False
 
     class Config:
         arbitrary_types_allowed = True
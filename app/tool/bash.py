@@ -1,9 +1,11 @@
 import asyncio
 import os
-from typing import Optional
+from typing import Callable, Optional
 
 from app.exceptions import ToolError
 from app.tool.base import BaseTool, CLIResult, ToolResult
+from app.tool.output_capture import OutputCapture, read_stream
+from app.tool.run import MAX_RESPONSE_LEN
 
 
 _BASH_DESCRIPTION = """Execute a bash command in the terminal.
@@ -20,13 +22,16 @@ class _BashSession:
     _process: asyncio.subprocess.Process
 
     command: str = "/bin/bash"
-    _output_delay: float = 0.2  # seconds
+    _head_bytes: int = MAX_RESPONSE_LEN // 2  # bytes kept from the start of a stream
+    _tail_bytes: int = MAX_RESPONSE_LEN // 2  # bytes kept from the end of a stream
     _timeout: float = 120.0  # seconds
     _sentinel: str = "<<exit>>"
 
-    def __init__(self):
+    def __init__(self, cwd: Optional[str] = None, env: Optional[dict] = None):
         self._started = False
         self._timed_out = False
+        self.cwd = cwd
+        self.env = env
 
     async def start(self):
         if self._started:
@@ -40,6 +45,8 @@ class _BashSession:
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
         )
 
         self._started = True
@@ -52,8 +59,13 @@ class _BashSession:
             return
         self._process.terminate()
 
-    async def run(self, command: str):
-        """Execute a command in the bash shell."""
+    async def run(
+        self,
+        command: str,
+        on_output: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None,
+    ):
+        """Execute a command in the bash shell, optionally streaming its output."""
         if not self._started:
             raise ToolError("Session has not started.")
         if self._process.returncode is not None:
@@ -71,53 +83,64 @@ class _BashSession:
         assert self._process.stdout
         assert self._process.stderr
 
-        # send command to the process
+        # send command to the process; the sentinel is echoed on both streams so
+        # that each reader knows where this command's output ends
         self._process.stdin.write(
-            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+            command.encode()
+            + f"\necho '{self._sentinel}'; echo '{self._sentinel}' >&2\n".encode()
         )
         await self._process.stdin.drain()
 
-        # read output from the process, until the sentinel is found
+        # read output from the process as it arrives, until the sentinels are found,
+        # keeping only the head and tail of long outputs
+        sentinel = self._sentinel.encode()
+        stdout = OutputCapture(self._head_bytes, self._tail_bytes)
+        stderr = OutputCapture(self._head_bytes, self._tail_bytes)
+        timeout = timeout or self._timeout
         try:
-            async with asyncio.timeout(self._timeout):
-                while True:
-                    await asyncio.sleep(self._output_delay)
-                    # if we read directly from stdout/stderr, it will wait forever for
-                    # EOF. use the StreamReader buffer directly instead.
-                    output = (
-                        self._process.stdout._buffer.decode()
-                    )  # pyright: ignore[reportAttributeAccessIssue]
-                    if self._sentinel in output:
-                        # strip the sentinel and break
-                        output = output[: output.index(self._sentinel)]
-                        break
+            async with asyncio.timeout(timeout):
+                found = await asyncio.gather(
+                    read_stream(self._process.stdout, stdout, sentinel, on_output),
+                    read_stream(self._process.stderr, stderr, sentinel, on_output),
+                )
         except asyncio.TimeoutError:
             self._timed_out = True
             raise ToolError(
-                f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
+                f"timed out: bash has not returned in {timeout} seconds and must be restarted",
             ) from None
 
+        output = stdout.getvalue()
         if output.endswith("\n"):
             output = output[:-1]
-
-        error = (
-            self._process.stderr._buffer.decode()
-        )  # pyright: ignore[reportAttributeAccessIssue]
+        error = stderr.getvalue()
         if error.endswith("\n"):
             error = error[:-1]
 
-        # clear the buffers so that the next output can be read correctly
-        self._process.stdout._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
-        self._process.stderr._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
+        if not all(found):
+            # The output ended before the sentinel, so the command ended the shell
+            returncode = await self._wait_exit()
+            error += f"\nbash has exited with returncode {returncode}"
+            return CLIResult(
+                output=output, error=error.lstrip("\n"), system="tool must be restarted"
+            )
 
         return CLIResult(output=output, error=error)
 
+    async def _wait_exit(self) -> int:
+        """Reap a shell whose output was closed, killing it if it lingers."""
+        try:
+            return await asyncio.wait_for(self._process.wait(), timeout=1)
+        except asyncio.TimeoutError:
+            self._process.kill()
+            return await self._process.wait()
+
 
 class Bash(BaseTool):
     """A tool for executing bash commands"""
 
     name: str = "bash"
     description: str = _BASH_DESCRIPTION
+    exclusive: bool = True
     parameters: dict = {
         "type": "object",
         "properties": {
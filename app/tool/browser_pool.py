@@ -0,0 +1,352 @@
+"""One long-lived browser shared by agent sessions through isolated contexts."""
+
+import asyncio
+import fnmatch
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Set
+from urllib.parse import urlsplit
+
+from browser_use import Browser as BrowserUseBrowser
+from browser_use import BrowserConfig
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+
+from app.config import BrowserSettings, config
+from app.logger import logger
+
+
+def _browser_config() -> BrowserConfig:
+    """Build the browser-use configuration from the [browser] settings."""
+    browser_config_kwargs = {"headless": False, "disable_security": True}
+
+    if config.browser_config:
+        from browser_use.browser.browser import ProxySettings
+
+        # handle proxy settings.
+        if config.browser_config.proxy and config.browser_config.proxy.server:
+            browser_config_kwargs["proxy"] = ProxySettings(
+                server=config.browser_config.proxy.server,
+                username=config.browser_config.proxy.username,
+                password=config.browser_config.proxy.password,
+            )
+
+        browser_attrs = [
+            "headless",
+            "disable_security",
+            "extra_chromium_args",
+            "chrome_instance_path",
+            "wss_url",
+            "cdp_url",
+        ]
+
+        for attr in browser_attrs:
+            value = getattr(config.browser_config, attr, None)
+            if value is not None:
+                if not isinstance(value, list) or value:
+                    browser_config_kwargs[attr] = value
+
+    return BrowserConfig(**browser_config_kwargs)
+
+
+def _context_config() -> BrowserContextConfig:
+    # if there is context config in the config, use it.
+    if (
+        config.browser_config
+        and hasattr(config.browser_config, "new_context_config")
+        and config.browser_config.new_context_config
+    ):
+        return config.browser_config.new_context_config
+    return BrowserContextConfig()
+
+
+class TrafficSnapshot(NamedTuple):
+    requests: int
+    blocked: int
+    bytes: int
+
+
+class PageMetrics:
+    """
+    Network traffic of one browser context.
+
+    Finished requests are counted with their transferred size (headers plus
+    encoded body); requests refused by fast mode are counted as blocked.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.bytes = 0
+        # Bytes already shown in an action report; sizes that arrive after
+        # their action was reported are included in the next report
+        self.reported_bytes = 0
+        self._pending: Set[asyncio.Task] = set()
+
+    def on_request_finished(self, request) -> None:
+        self.requests += 1
+        # Sizes need a round trip to the browser, so they are added as they come
+        task = asyncio.create_task(self._add_size(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _add_size(self, request) -> None:
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.bytes += sizes["responseHeadersSize"] + max(0, sizes["responseBodySize"])
+
+    def snapshot(self) -> TrafficSnapshot:
+        return TrafficSnapshot(self.requests, self.blocked, self.bytes)
+
+
+def _domain_blocked(host: str, patterns: List[str]) -> bool:
+    for pattern in patterns:
+        if "*" in pattern or "?" in pattern:
+            if fnmatch.fnmatch(host, pattern):
+                return True
+        elif host == pattern or host.endswith("." + pattern):
+            return True
+    return False
+
+
+class _Lease:
+    """A context checked out by one agent session."""
+
+    def __init__(self, context: BrowserContext):
+        self.context = context
+        self.last_used = time.monotonic()
+
+
+class BrowserPool:
+    """
+    A single browser process with one isolated context per agent session.
+
+    The browser is launched once and outlives the sessions using it, so only
+    the first session pays for the cold start. A session checks out its own
+    context (cookies, storage and tabs are not shared) and keeps it until it
+    releases it or leaves it idle for `context_idle_timeout` seconds; a session
+    inside `in_use` is never idle, however long its action runs. At most
+    `max_contexts` sessions hold a context at a time, others wait for one to
+    be released. `prewarm_contexts` fresh contexts are kept ready so that a
+    new session does not wait for one to be created.
+
+    Every context records its traffic in a `PageMetrics`. In `fast_mode`
+    requests for the blocked resource types and domains are aborted before
+    they leave the browser.
+    """
+
+    def __init__(self, settings: Optional[BrowserSettings] = None):
+        settings = settings or BrowserSettings()
+        self.settings = settings
+        self.max_contexts = max(1, settings.max_contexts)
+        self.idle_timeout = settings.context_idle_timeout
+        self.prewarm = max(0, settings.prewarm_contexts)
+
+        self.browser: Optional[BrowserUseBrowser] = None
+        self._leases: Dict[str, _Lease] = {}
+        self._warm: List[BrowserContext] = []
+        # Sessions whose context is being created, counted against max_contexts
+        self._reserved = 0
+        self._changed = asyncio.Condition()
+        self._launch_lock = asyncio.Lock()
+        self._pending: Set[asyncio.Task] = set()
+        self._metrics: Dict[int, PageMetrics] = {}
+        # Sessions in the middle of an action -> number of running actions
+        self._busy: Dict[str, int] = {}
+
+    async def _new_context(self) -> BrowserContext:
+        async with self._launch_lock:
+            if self.browser is None:
+                browser = BrowserUseBrowser(_browser_config())
+                await browser.get_playwright_browser()
+                self.browser = browser
+        context = await self.browser.new_context(_context_config())
+        # Open the underlying browser context and its first page now
+        session = await context.get_session()
+        await self._instrument(context, session.context)
+        return context
+
+    async def _instrument(self, context: BrowserContext, playwright_context) -> None:
+        """Attach traffic metrics and, in fast mode, request blocking."""
+        metrics = PageMetrics()
+        self._metrics[id(context)] = metrics
+        playwright_context.on("requestfinished", metrics.on_request_finished)
+        if not self.settings.fast_mode:
+            return
+
+        blocked_types = set(self.settings.block_resource_types)
+        blocked_domains = [d.lower() for d in self.settings.block_domains]
+
+        async def handle_route(route) -> None:
+            request = route.request
+            host = (urlsplit(request.url).hostname or "").lower()
+            if request.resource_type in blocked_types or _domain_blocked(
+                host, blocked_domains
+            ):
+                metrics.blocked += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+
+        await playwright_context.route("**/*", handle_route)
+
+    def metrics(self, context: BrowserContext) -> Optional[PageMetrics]:
+        """Return the traffic metrics of a context handed out by this pool."""
+        return self._metrics.get(id(context))
+
+    @asynccontextmanager
+    async def in_use(self, session_id: str) -> AsyncIterator[None]:
+        """Keep a session's context from being evicted while it runs an action."""
+        self._busy[session_id] = self._busy.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            if self._busy[session_id] > 1:
+                self._busy[session_id] -= 1
+            else:
+                del self._busy[session_id]
+            lease = self._leases.get(session_id)
+            if lease is not None:
+                # Idle time counts from the end of the last action
+                lease.last_used = time.monotonic()
+
+    async def acquire(self, session_id: str) -> BrowserContext:
+        """Return the context of a session, checking one out if it has none."""
+        lease = self._leases.get(session_id)
+        if lease is not None:
+            lease.last_used = time.monotonic()
+            return lease.context
+
+        evicted: List[BrowserContext] = []
+        async with self._changed:
+            while len(self._leases) + self._reserved >= self.max_contexts:
+                evicted += self._pop_idle()
+                if len(self._leases) + self._reserved < self.max_contexts:
+                    break
+                # Wake up when a context is released or the next lease goes idle
+                oldest = min(
+                    (
+                        lease.last_used
+                        for session, lease in self._leases.items()
+                        if session not in self._busy
+                    ),
+                    default=time.monotonic(),
+                )
+                timeout = max(0.1, oldest + self.idle_timeout - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._reserved += 1
+        # Closing can take a while, so it happens after the lock is released
+        for context in evicted:
+            await self._close_context(context)
+
+        try:
+            context = self._warm.pop() if self._warm else await self._new_context()
+        except BaseException:
+            async with self._changed:
+                self._reserved -= 1
+                self._changed.notify_all()
+            raise
+
+        async with self._changed:
+            self._reserved -= 1
+            self._leases[session_id] = _Lease(context)
+            self._changed.notify_all()
+        self._refill()
+        return context
+
+    async def release(self, session_id: str) -> None:
+        """Close a session's context; the browser keeps running."""
+        async with self._changed:
+            lease = self._leases.pop(session_id, None)
+            self._changed.notify_all()
+        if lease is not None:
+            await self._close_context(lease.context)
+
+    def _pop_idle(self) -> List[BrowserContext]:
+        """
+        Take the contexts of idle sessions out of the pool for closing.
+
+        The pool's lock must be held. Sessions running an action are skipped.
+        """
+        now = time.monotonic()
+        idle = []
+        for session_id, lease in list(self._leases.items()):
+            if (
+                session_id not in self._busy
+                and now - lease.last_used > self.idle_timeout
+            ):
+                del self._leases[session_id]
+                logger.info(f"Closing browser context of idle session {session_id}")
+                idle.append(lease.context)
+        if idle:
+            self._changed.notify_all()
+        return idle
+
+    async def _close_context(self, context: BrowserContext) -> None:
+        self._metrics.pop(id(context), None)
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser context: {e}")
+
+    def _refill(self) -> None:
+        """Create contexts in the background until `prewarm` are ready."""
+        missing = self.prewarm - len(self._warm) - len(self._pending)
+        for _ in range(max(0, missing)):
+            task = asyncio.create_task(self._warm_one())
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _warm_one(self) -> None:
+        try:
+            self._warm.append(await self._new_context())
+        except Exception as e:
+            logger.warning(f"Failed to prepare a browser context: {e}")
+
+    async def start(self) -> None:
+        """Launch the browser and prepare the warm contexts ahead of use."""
+        self._refill()
+        if self._pending:
+            await asyncio.gather(*self._pending)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._leases),
+            "warm": len(self._warm),
+            "max_contexts": self.max_contexts,
+        }
+
+    async def close(self) -> None:
+        """Close every context and the browser."""
+        for task in list(self._pending):
+            task.cancel()
+        async with self._changed:
+            contexts = [lease.context for lease in self._leases.values()]
+            contexts += self._warm
+            self._leases.clear()
+            self._warm = []
+            self._changed.notify_all()
+        for context in contexts:
+            await self._close_context(context)
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+
+
+# One pool per event loop, since Playwright objects are bound to their loop
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BrowserPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the browser pool of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        _pools[loop] = BrowserPool(config.browser_config)
+    return _pools[loop]
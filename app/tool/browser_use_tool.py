@@ -1,17 +1,23 @@
 import asyncio
+import functools
 import json
+import time
+import uuid
 from typing import Generic, Optional, TypeVar
 
 from browser_use import Browser as BrowserUseBrowser
-from browser_use import BrowserConfig
-from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.browser.context import BrowserContext
 from browser_use.dom.service import DomService
 from pydantic import Field, field_validator
 from pydantic_core.core_schema import ValidationInfo
 
-from app.config import config
+from app.config import BrowserSettings, config
 from app.llm import LLM
+from app.logger import logger
 from app.tool.base import BaseTool, ToolResult
+from app.tool.browser_pool import TrafficSnapshot, get_browser_pool
+from app.tool.content_cache import CachedPage, content_digest, get_content_cache
+from app.tool.page_extractor import extract_page_content
 from app.tool.web_search import WebSearch
 
 
@@ -47,10 +53,58 @@ Utility:
 
 Context = TypeVar("Context")
 
+# Actions whose duration is reported as the page-load time
+_NAVIGATION_ACTIONS = {"go_to_url", "go_back", "refresh", "web_search", "open_tab"}
+
+
+def _reports_traffic(execute):
+    """
+    Append the duration and network traffic of a browser action to its output.
+
+    Requests are the difference between snapshots of the context's metrics
+    around the action. Sizes still being read from the browser are not
+    waited for; they show up in the report of a later action.
+    """
+
+    @functools.wraps(execute)
+    async def wrapper(self: "BrowserUseTool", action: str, *args, **kwargs):
+        pool = get_browser_pool()
+        context = self.context
+        metrics = pool.metrics(context) if context else None
+        before = metrics.snapshot() if metrics else None
+        started = time.perf_counter()
+        result = await execute(self, action, *args, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        if self.context is not context:
+            # The action ran in a context checked out just now
+            metrics = pool.metrics(self.context) if self.context else None
+            before = TrafficSnapshot(0, 0, 0)
+        if not metrics or result.error:
+            return result
+        after = metrics.snapshot()
+        requests = after.requests - before.requests
+        blocked = after.blocked - before.blocked
+        navigation = action in _NAVIGATION_ACTIONS
+        if not navigation and not requests and not blocked:
+            return result
+
+        received = after.bytes - metrics.reported_bytes
+        metrics.reported_bytes = after.bytes
+        summary = f"{elapsed:.2f}s, {received / 1024:.0f} KB in {requests} requests"
+        if blocked:
+            summary += f", {blocked} blocked"
+        logger.info(f"Browser action '{action}': {summary}")
+        label = "page load" if navigation else "network"
+        return result.replace(output=f"{result.output}\n[{label}: {summary}]")
+
+    return wrapper
+
 
 class BrowserUseTool(BaseTool, Generic[Context]):
     name: str = "browser_use"
     description: str = _BROWSER_DESCRIPTION
+    exclusive: bool = True
     parameters: dict = {
         "type": "object",
         "properties": {
@@ -138,6 +192,8 @@ class BrowserUseTool(BaseTool, Generic[Context]):
     context: Optional[BrowserContext] = Field(default=None, exclude=True)
     dom_service: Optional[DomService] = Field(default=None, exclude=True)
     web_search_tool: WebSearch = Field(default_factory=WebSearch, exclude=True)
+    # Key of this tool's context in the shared browser pool
+    session_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
 
     # Context for generic functionality
     tool_context: Optional[Context] = Field(default=None, exclude=True)
@@ -151,54 +207,17 @@ class BrowserUseTool(BaseTool, Generic[Context]):
         return v
 
     async def _ensure_browser_initialized(self) -> BrowserContext:
-        """Ensure browser and context are initialized."""
-        if self.browser is None:
-            browser_config_kwargs = {"headless": False, "disable_security": True}
-
-            if config.browser_config:
-                from browser_use.browser.browser import ProxySettings
-
-                # handle proxy settings.
-                if config.browser_config.proxy and config.browser_config.proxy.server:
-                    browser_config_kwargs["proxy"] = ProxySettings(
-                        server=config.browser_config.proxy.server,
-                        username=config.browser_config.proxy.username,
-                        password=config.browser_config.proxy.password,
-                    )
-
-                browser_attrs = [
-                    "headless",
-                    "disable_security",
-                    "extra_chromium_args",
-                    "chrome_instance_path",
-                    "wss_url",
-                    "cdp_url",
-                ]
-
-                for attr in browser_attrs:
-                    value = getattr(config.browser_config, attr, None)
-                    if value is not None:
-                        if not isinstance(value, list) or value:
-                            browser_config_kwargs[attr] = value
-
-            self.browser = BrowserUseBrowser(BrowserConfig(**browser_config_kwargs))
-
-        if self.context is None:
-            context_config = BrowserContextConfig()
-
-            # if there is context config in the config, use it.
-            if (
-                config.browser_config
-                and hasattr(config.browser_config, "new_context_config")
-                and config.browser_config.new_context_config
-            ):
-                context_config = config.browser_config.new_context_config
-
-            self.context = await self.browser.new_context(context_config)
-            self.dom_service = DomService(await self.context.get_current_page())
-
+        """Check out this session's context from the shared browser pool."""
+        pool = get_browser_pool()
+        context = await pool.acquire(self.session_id)
+        if context is not self.context:
+            # First use, or the pool closed the previous context while idle
+            self.browser = pool.browser
+            self.context = context
+            self.dom_service = DomService(await context.get_current_page())
         return self.context
 
+    @_reports_traffic
     async def execute(
         self,
         action: str,
@@ -232,7 +251,7 @@ class BrowserUseTool(BaseTool, Generic[Context]):
         Returns:
             ToolResult with the action's output or error
         """
-        async with self.lock:
+        async with self.lock, get_browser_pool().in_use(self.session_id):
             try:
                 context = await self._ensure_browser_initialized()
 
@@ -248,8 +267,9 @@ class BrowserUseTool(BaseTool, Generic[Context]):
                             error="URL is required for 'go_to_url' action"
                         )
                     page = await context.get_current_page()
-                    await page.goto(url)
+                    response = await page.goto(url)
                     await page.wait_for_load_state()
+                    await self._cache_page(page, response)
                     return ToolResult(output=f"Navigated to {url}")
 
                 elif action == "go_back":
@@ -280,8 +300,9 @@ class BrowserUseTool(BaseTool, Generic[Context]):
                             )
 
                         page = await context.get_current_page()
-                        await page.goto(url_to_navigate)
+                        response = await page.goto(url_to_navigate)
                         await page.wait_for_load_state()
+                        await self._cache_page(page, response)
 
                         return ToolResult(
                             output=f"Searched for '{query}' and navigated to first result: {url_to_navigate}\nAll results:"
@@ -407,46 +428,46 @@ class BrowserUseTool(BaseTool, Generic[Context]):
                         # Get page content and convert to markdown for better processing
                         html_content = await page.content()
 
-                        # Import markdownify here to avoid global import
-                        try:
-                            import markdownify
-
-                            content = markdownify.markdownify(html_content)
-                        except ImportError:
-                            # Fallback if markdownify is not available
-                            content = html_content
-
-                        # Create prompt for LLM
-                        prompt_text = """
-Your task is to extract the content of the page. You will be given a page and a goal, and you should extract all relevant information around this goal from the page.
-
-Examples of extraction goals:
-- Extract all company names
-- Extract specific descriptions
-- Extract all information about a topic
-- Extract links with companies in structured format
-- Extract all links
-
-If the goal is vague, summarize the page. Respond in JSON format.
-
-Extraction goal: {goal}
+                        # Reuse the conversion and earlier extractions while the
+                        # page content is unchanged
+                        cache = get_content_cache()
+                        cached = await self._cache_page(page, html=html_content)
+                        if cached and goal in cached.extractions:
+                            return ToolResult(
+                                output=f"Extracted from page:\n{cached.extractions[goal]}\n"
+                            )
 
-Page content:
-{page}
-"""
-                        # Format the prompt with the goal and content
-                        max_content_length = min(50000, len(content))
-                        formatted_prompt = prompt_text.format(
-                            goal=goal, page=content[:max_content_length]
+                        if cached and cached.markdown is not None:
+                            content = cached.markdown
+                        else:
+                            # Import markdownify here to avoid global import
+                            try:
+                                import markdownify
+
+                                content = markdownify.markdownify(html_content)
+                            except ImportError:
+                                # Fallback if markdownify is not available
+                                content = html_content
+
+                        # Extract from the chunks relevant to the goal, so that long
+                        # pages are neither cut off nor sent whole
+                        browser_config = config.browser_config or BrowserSettings()
+                        response = await extract_page_content(
+                            self.llm,
+                            goal,
+                            content,
+                            chunk_chars=browser_config.extract_chunk_chars,
+                            max_chunks=browser_config.extract_max_chunks,
+                            concurrency=browser_config.extract_concurrency,
                         )
-
-                        # Create a proper message list for the LLM
-                        from app.schema import Message
-
-                        messages = [Message.user_message(formatted_prompt)]
-
-                        # Use LLM to extract content based on the goal
-                        response = await self.llm.ask(messages)
+                        if cached:
+                            cache.update(
+                                cached.url,
+                                cached.digest,
+                                markdown=content,
+                                extraction=(goal, response),
+                                scope=self.session_id,
+                            )
 
                         msg = f"Extracted from page:\n{response}\n"
                         return ToolResult(output=msg)
@@ -495,6 +516,34 @@ Page content:
             except Exception as e:
                 return ToolResult(error=f"Browser action '{action}' failed: {str(e)}")
 
+    async def _cache_page(
+        self, page, response=None, html: Optional[str] = None
+    ) -> Optional[CachedPage]:
+        """
+        Record the current page in the content cache, under this session's
+        own scope since it may show logged-in content.
+
+        An entry whose content still matches the live page is kept together
+        with its markdown and extractions; otherwise the page is stored anew,
+        with the headers of its navigation response when it has just been
+        loaded, and without any once scripts may have changed it.
+        """
+        cache = get_content_cache()
+        if not cache.enabled:
+            return None
+        if html is None:
+            html = await page.content()
+        cached, _ = cache.lookup(page.url, scope=self.session_id)
+        if cached and cached.digest == content_digest(html):
+            return cached
+        return cache.put(
+            page.url,
+            html,
+            response.headers if response else None,
+            await page.title(),
+            scope=self.session_id,
+        )
+
     async def get_current_state(
         self, context: Optional[BrowserContext] = None
     ) -> ToolResult:
@@ -517,8 +566,15 @@ Page content:
             elif hasattr(ctx, "config") and hasattr(ctx.config, "browser_window_size"):
                 viewport_height = ctx.config.browser_window_size.get("height", 0)
 
-            # Take a screenshot for the state
-            screenshot = await ctx.take_screenshot(full_page=True)
+            # Take a screenshot for the state, unless no model could look at it
+            browser_config = config.browser_config or BrowserSettings()
+            screenshot = None
+            if not (
+                browser_config.fast_mode
+                and browser_config.skip_screenshots
+                and "vision" not in config.llm
+            ):
+                screenshot = await ctx.take_screenshot(full_page=True)
 
             # Build the state info with all required fields
             state_info = {
@@ -549,25 +605,14 @@ Page content:
             return ToolResult(error=f"Failed to get browser state: {str(e)}")
 
     async def cleanup(self):
-        """Clean up browser resources."""
+        """Release this session's browser context; the shared browser keeps running."""
         async with self.lock:
+            get_content_cache().drop_scope(self.session_id)
             if self.context is not None:
-                await self.context.close()
+                await get_browser_pool().release(self.session_id)
+                self.browser = None
                 self.context = None
                 self.dom_service = None
-            if self.browser is not None:
-                await self.browser.close()
-                self.browser = None
-
-    def __del__(self):
-        """Ensure cleanup when object is destroyed."""
-        if self.browser is not None or self.context is not None:
-            try:
-                asyncio.run(self.cleanup())
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                loop.run_until_complete(self.cleanup())
-                loop.close()
 
     @classmethod
     def create_with_context(cls, context: Context) -> "BrowserUseTool[Context]":
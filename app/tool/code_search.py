@@ -0,0 +1,404 @@
+"""Trigram-indexed code search over the workspace."""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from app.config import WORKSPACE_ROOT
+from app.tool.base import BaseTool, ToolResult
+from app.tool.workspace_index import get_workspace_index
+
+
+_CODE_SEARCH_DESCRIPTION = """Search the contents of the files in the workspace, like `grep -rn` but answered from an index in milliseconds.
+* `query` is a plain substring by default; set `regex` to true for a Python regular expression
+* Results list `path:line:text` for matches and `path-line-text` for context lines, with paths relative to the workspace
+* Use `path` to restrict the search to a file or directory
+* Hidden and git-ignored files, binary files and files larger than 1 MB are not searched
+"""
+
+# Files larger than this are not indexed
+MAX_FILE_SIZE: int = 1024 * 1024
+# Seconds between rescans of the workspace for changes made outside the tools
+REFRESH_INTERVAL: float = 10.0
+
+Trigram = Tuple[int, int, int]
+
+
+class SearchMatch(NamedTuple):
+    path: str
+    line: int
+    text: str
+    # (line number, text) of the surrounding lines
+    context: List[Tuple[int, str]]
+
+
+def _trigrams(data: bytes) -> Set[Trigram]:
+    """
+    Case-folded (ASCII) trigrams within the lines of a byte string.
+
+    Trigrams spanning a newline are left out, which lets repeated lines be
+    processed only once.
+    """
+    trigrams: Set[Trigram] = set()
+    for line in set(data.lower().split(b"\n")):
+        trigrams.update(zip(line, line[1:], line[2:]))
+    return trigrams
+
+
+def _new_postings() -> array:
+    return array("I")
+
+
+def _required_literals(pattern: str, flags: int = 0) -> List[str]:
+    """
+    Literal strings that every match of a regular expression contains.
+
+    Only plain concatenations, groups and repeats of at least one are followed;
+    anything else (alternations, classes, optional parts) ends a literal.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []
+
+    literals: List[str] = []
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    def visit(items: Iterable) -> None:
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                current.append(chr(av))
+            elif op is sre_parse.SUBPATTERN:
+                visit(av[-1])
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+                flush()
+                visit(av[2])
+                flush()
+            else:
+                flush()
+
+    visit(parsed)
+    flush()
+    return literals
+
+
+class TrigramIndex:
+    """
+    Incrementally maintained trigram index of the text files under a root.
+
+    Every file gets a document id and each trigram maps to the sorted ids of
+    the files containing it, so a query only reads the files holding all the
+    trigrams of its literal parts. A changed file is re-added under a new id
+    and its old id is marked dead; the index is rebuilt once most ids are dead.
+
+    Files reported changed with `mark_changed` are queued and only indexed by
+    the next search, so reporting never waits for the index.
+    """
+
+    def __init__(self, root: str, max_file_size: int = MAX_FILE_SIZE):
+        self.root = os.path.abspath(root)
+        self.max_file_size = max_file_size
+        self._postings: Dict[Trigram, array] = defaultdict(_new_postings)
+        self._paths: List[Optional[str]] = []
+        # path -> (document id, mtime_ns, size); the id is -1 for skipped files
+        self._docs: Dict[str, Tuple[int, int, int]] = {}
+        self._lock = threading.RLock()
+        # Paths reported changed and not yet indexed, under their own lock
+        self._changed: Set[str] = set()
+        self._changed_lock = threading.Lock()
+        self._built = False
+        self._refreshed_at = 0.0
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def build(self) -> None:
+        """Index all files under the root from scratch."""
+        with self._lock:
+            # Files changed from here on are read by the scan or queued again
+            with self._changed_lock:
+                self._changed.clear()
+            self._postings = defaultdict(_new_postings)
+            self._paths = []
+            self._docs = {}
+            if os.path.isdir(self.root):
+                for path in get_workspace_index().iter_files(self.root):
+                    self._add(path)
+            self._built = True
+            self._refreshed_at = time.monotonic()
+
+    def refresh(self) -> None:
+        """Pick up files added, changed or removed since the last scan."""
+        with self._lock:
+            seen = set()
+            if os.path.isdir(self.root):
+                for path in get_workspace_index().iter_files(self.root):
+                    seen.add(path)
+                    self.update_file(path)
+            for path in set(self._docs) - seen:
+                self._remove(path)
+            self._refreshed_at = time.monotonic()
+            self._compact()
+
+    def mark_changed(self, path: str) -> None:
+        """Queue a file that may have changed for the next search to index."""
+        with self._changed_lock:
+            self._changed.add(os.path.abspath(path))
+
+    def _apply_changes(self) -> None:
+        """Index the files queued by `mark_changed`."""
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        if not changed:
+            return
+        with self._lock:
+            for path in changed:
+                self.update_file(path)
+            self._compact()
+
+    def _compact(self) -> None:
+        # Rebuild once dead ids outnumber the live ones
+        if len(self._paths) > 2 * max(len(self._docs), 64):
+            self.build()
+
+    def update_file(self, path: str) -> None:
+        """Bring the index up to date with a file that may have changed."""
+        path = os.path.abspath(path)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._remove(path)
+                return
+            doc = self._docs.get(path)
+            if doc and doc[1:] == (stat.st_mtime_ns, stat.st_size):
+                return
+            self._remove(path)
+            self._add(path, stat)
+
+    def _add(self, path: str, stat: Optional[os.stat_result] = None) -> None:
+        try:
+            stat = stat or os.stat(path)
+            data = b""
+            if stat.st_size <= self.max_file_size:
+                with open(path, "rb") as f:
+                    data = f.read()
+        except OSError:
+            return
+        if stat.st_size > self.max_file_size or b"\0" in data[:8192]:
+            # Remember binary and large files so that rescans skip them quickly
+            self._docs[path] = (-1, stat.st_mtime_ns, stat.st_size)
+            return
+
+        doc_id = len(self._paths)
+        self._paths.append(path)
+        self._docs[path] = (doc_id, stat.st_mtime_ns, stat.st_size)
+        postings = self._postings
+        for trigram in _trigrams(data):
+            postings[trigram].append(doc_id)
+
+    def _remove(self, path: str) -> None:
+        doc = self._docs.pop(path, None)
+        if doc and doc[0] >= 0:
+            self._paths[doc[0]] = None
+
+    def candidates(self, literals: List[str], ignore_case: bool = False) -> List[str]:
+        """Paths of the files that may contain all the given literals."""
+        trigrams: Set[Trigram] = set()
+        for literal in literals:
+            data = literal.encode()
+            for trigram in _trigrams(data):
+                # Case-insensitive matches of non-ASCII text are not case-folded
+                if ignore_case and max(trigram) >= 0x80:
+                    continue
+                trigrams.add(trigram)
+
+        with self._lock:
+            if not trigrams:
+                return sorted(path for path, doc in self._docs.items() if doc[0] >= 0)
+            lists = sorted(
+                (self._postings.get(trigram, array("I")) for trigram in trigrams),
+                key=len,
+            )
+            ids = set(lists[0])
+            for postings in lists[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(postings)
+            return sorted(path for i in ids if (path := self._paths[i]) is not None)
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        path: Optional[str] = None,
+        context_lines: int = 0,
+        max_results: int = 50,
+    ) -> List[SearchMatch]:
+        """Find the lines matching a substring or regular expression."""
+        if not self._built:
+            self.build()
+        elif time.monotonic() - self._refreshed_at > REFRESH_INTERVAL:
+            self.refresh()
+        self._apply_changes()
+
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if not regex:
+            pattern = re.escape(pattern)
+        compiled = re.compile(pattern, flags | re.MULTILINE)
+
+        prefix = os.path.abspath(os.path.join(self.root, path)) if path else None
+        matches: List[SearchMatch] = []
+        for candidate in self.candidates(
+            _required_literals(pattern, flags), ignore_case=not case_sensitive
+        ):
+            if (
+                prefix
+                and candidate != prefix
+                and not candidate.startswith(prefix + os.sep)
+            ):
+                continue
+            try:
+                with open(candidate, encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+
+            lines = None
+            last_line = -1
+            line_no, scanned = 0, 0
+            for match in compiled.finditer(text):
+                line_no += text.count("\n", scanned, match.start())
+                scanned = match.start()
+                if line_no == last_line:
+                    continue
+                last_line = line_no
+                if lines is None:
+                    lines = text.split("\n")
+                first = max(0, line_no - context_lines)
+                last = min(len(lines), line_no + context_lines + 1)
+                matches.append(
+                    SearchMatch(
+                        os.path.relpath(candidate, self.root),
+                        line_no + 1,
+                        lines[line_no],
+                        [(i + 1, lines[i]) for i in range(first, last) if i != line_no],
+                    )
+                )
+                if len(matches) >= max_results:
+                    return matches
+        return matches
+
+
+_code_index: Optional[TrigramIndex] = None
+
+
+def get_code_index() -> TrigramIndex:
+    """Return the trigram index of the workspace shared by all tools."""
+    global _code_index
+    if _code_index is None:
+        _code_index = TrigramIndex(str(WORKSPACE_ROOT))
+    return _code_index
+
+
+def notify_file_changed(path: str) -> None:
+    """Tell the workspace index that a tool wrote or removed a file."""
+    index = get_code_index()
+    path = os.path.abspath(path)
+    if path.startswith(index.root + os.sep):
+        index.mark_changed(path)
+
+
+class CodeSearch(BaseTool):
+    """A tool for searching file contents in the workspace"""
+
+    name: str = "code_search"
+    description: str = _CODE_SEARCH_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "(required) The text or regular expression to search for.",
+            },
+            "regex": {
+                "type": "boolean",
+                "description": "(optional) Treat `query` as a Python regular expression. Default is false.",
+                "default": False,
+            },
+            "case_sensitive": {
+                "type": "boolean",
+                "description": "(optional) Match case. Default is true.",
+                "default": True,
+            },
+            "path": {
+                "type": "string",
+                "description": "(optional) File or directory to search in, relative to the workspace.",
+            },
+            "context_lines": {
+                "type": "integer",
+                "description": "(optional) Lines of context shown around each match. Default is 2.",
+                "default": 2,
+            },
+        },
+        "required": ["query"],
+    }
+
+    max_results: int = 50
+
+    async def execute(
+        self,
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        path: Optional[str] = None,
+        context_lines: int = 2,
+    ) -> ToolResult:
+        try:
+            matches = await asyncio.to_thread(
+                get_code_index().search,
+                query,
+                regex=regex,
+                case_sensitive=case_sensitive,
+                path=path,
+                context_lines=context_lines,
+                max_results=self.max_results,
+            )
+        except re.error as e:
+            return ToolResult(error=f"Invalid regular expression: {e}")
+
+        if not matches:
+            return ToolResult(output=f"No matches found for `{query}`.")
+
+        blocks = []
+        for match in matches:
+            lines = [(match.line, match.text, ":")]
+            lines += [(line, text, "-") for line, text in match.context]
+            blocks.append(
+                "\n".join(
+                    f"{match.path}{sep}{line}{sep}{text}"
+                    for line, text, sep in sorted(lines)
+                )
+            )
+        output = ("\n--\n" if context_lines else "\n").join(blocks)
+        if len(matches) >= self.max_results:
+            output += f"\n(showing the first {self.max_results} matches, narrow the query or `path` to see more)"
+        return ToolResult(output=output)
@@ -0,0 +1,255 @@
+"""Cache of fetched web pages for the browser and fetch tools."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Mapping, NamedTuple, Optional, Set, Tuple
+
+from app.config import ContentCacheSettings, config
+
+
+# Response headers kept with a page; the validators are sent back on revalidation
+_KEPT_HEADERS = ("etag", "last-modified", "content-type", "cache-control")
+
+# Scope of pages every tool and session may read
+SHARED_SCOPE = ""
+
+
+class CachedPage(NamedTuple):
+    url: str
+    html: str
+    # sha1 of `html`, to tell whether a live page still matches the cached copy
+    digest: str
+    headers: Dict[str, str]
+    stored_at: float
+    title: str = ""
+    markdown: Optional[str] = None
+    # Extraction goal -> result of extracting it from this exact content
+    extractions: Dict[str, str] = {}
+    # URL the page was served from after redirects
+    final_url: str = ""
+
+    @property
+    def size(self) -> int:
+        return (
+            len(self.html)
+            + len(self.markdown or "")
+            + sum(len(goal) + len(text) for goal, text in self.extractions.items())
+        )
+
+
+def content_digest(html: str) -> str:
+    return hashlib.sha1(html.encode(errors="replace")).hexdigest()
+
+
+def _cache_directives(headers: Mapping[str, str]) -> Set[str]:
+    return {
+        directive.split("=", 1)[0].strip().lower()
+        for directive in headers.get("cache-control", "").split(",")
+    }
+
+
+class ContentCache:
+    """
+    LRU of web pages keyed by scope and URL, bounded by a byte budget.
+
+    Pages in `SHARED_SCOPE` are served to every caller, so only anonymous
+    responses go there: pages fetched with cookies or credentials, or marked
+    `Cache-Control: private`, are not stored in it. What a browser session
+    renders (logged-in pages included) is stored under the session's own
+    scope and dropped with `drop_scope` when the session ends. Pages marked
+    `no-store` are never stored.
+
+    A page is served as is for `ttl` seconds after it was stored or last
+    revalidated. Once stale, callers send `validators()` with their request
+    and call `revalidated()` on a 304 to keep using the cached copy.
+    """
+
+    def __init__(self, settings: Optional[ContentCacheSettings] = None):
+        settings = settings or ContentCacheSettings()
+        self.enabled = settings.enabled
+        self.ttl = settings.ttl
+        self.max_bytes = settings.max_bytes
+        self._pages: "OrderedDict[Tuple[str, str], CachedPage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.stored_at <= self.ttl
+
+    def lookup(
+        self, url: str, scope: str = SHARED_SCOPE
+    ) -> Tuple[Optional[CachedPage], bool]:
+        """
+        Return the cached page of a URL and whether it is fresh.
+
+        A fresh page counts as a hit; a stale one counts as a hit only once
+        the caller reports it `revalidated`.
+        """
+        if not self.enabled:
+            return None, False
+        key = (scope, url)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None, False
+            self._pages.move_to_end(key)
+            fresh = self.is_fresh(page)
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+            return page, fresh
+
+    @staticmethod
+    def validators(page: CachedPage) -> Dict[str, str]:
+        """Conditional request headers that revalidate a cached page."""
+        headers = {}
+        if "etag" in page.headers:
+            headers["If-None-Match"] = page.headers["etag"]
+        if "last-modified" in page.headers:
+            headers["If-Modified-Since"] = page.headers["last-modified"]
+        return headers
+
+    def revalidated(self, url: str, scope: str = SHARED_SCOPE) -> Optional[CachedPage]:
+        """Mark a cached page as confirmed unchanged by the server."""
+        key = (scope, url)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                return None
+            page = page._replace(stored_at=time.time())
+            self._pages[key] = page
+            self.revalidations += 1
+            return page
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        headers: Optional[Mapping[str, str]] = None,
+        title: str = "",
+        markdown: Optional[str] = None,
+        final_url: Optional[str] = None,
+        scope: str = SHARED_SCOPE,
+        credentialed: bool = False,
+    ) -> Optional[CachedPage]:
+        """
+        Store a freshly fetched page, replacing any older copy.
+
+        Args:
+            headers: Headers of the response the HTML came from, if any.
+            credentialed: Whether the request carried cookies or credentials.
+        """
+        if not self.enabled:
+            return None
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        directives = _cache_directives(headers)
+        if "no-store" in directives or (
+            scope == SHARED_SCOPE and (credentialed or "private" in directives)
+        ):
+            self.discard(url, scope)
+            return None
+        page = CachedPage(
+            url,
+            html,
+            content_digest(html),
+            {k: headers[k] for k in _KEPT_HEADERS if k in headers},
+            time.time(),
+            title,
+            markdown,
+            final_url=final_url or url,
+        )
+        if page.size > self.max_bytes:
+            self.discard(url, scope)
+            return None
+        with self._lock:
+            self._store((scope, url), page)
+        return page
+
+    def update(
+        self,
+        url: str,
+        digest: str,
+        markdown: Optional[str] = None,
+        extraction: Optional[Tuple[str, str]] = None,
+        scope: str = SHARED_SCOPE,
+    ) -> None:
+        """
+        Attach derived content to a cached page.
+
+        Nothing is attached if the page was replaced by content with another
+        digest in the meantime.
+        """
+        key = (scope, url)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or page.digest != digest:
+                return
+            if markdown is not None:
+                page = page._replace(markdown=markdown)
+            if extraction is not None:
+                goal, result = extraction
+                page = page._replace(extractions={**page.extractions, goal: result})
+            self._store(key, page)
+
+    def _store(self, key: Tuple[str, str], page: CachedPage) -> None:
+        old = self._pages.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._pages[key] = page
+        self._bytes += page.size
+        while self._bytes > self.max_bytes and len(self._pages) > 1:
+            _, evicted = self._pages.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def discard(self, url: str, scope: str = SHARED_SCOPE) -> None:
+        with self._lock:
+            page = self._pages.pop((scope, url), None)
+            if page is not None:
+                self._bytes -= page.size
+
+    def drop_scope(self, scope: str) -> None:
+        """Forget every page stored under a scope."""
+        with self._lock:
+            for key in [key for key in self._pages if key[0] == scope]:
+                self._bytes -= self._pages.pop(key).size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and memory use"""
+        lookups = self.hits + self.stale + self.misses
+        return {
+            "hits": self.hits,
+            "stale": self.stale,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.revalidations) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._pages),
+            "bytes": self._bytes,
+        }
+
+
+_content_cache: Optional[ContentCache] = None
+
+
+def get_content_cache() -> ContentCache:
+    """Return the page cache shared by all tools."""
+    global _content_cache
+    if _content_cache is None:
+        _content_cache = ContentCache(config.content_cache_config)
+    return _content_cache
@@ -4,6 +4,7 @@ import aiofiles
 
 from app.config import WORKSPACE_ROOT
 from app.tool.base import BaseTool
+from app.tool.code_search import notify_file_changed
 
 
 class FileSaver(BaseTool):
@@ -61,6 +62,7 @@ The tool accepts content and a file path, and saves the content to that location
             # Write directly to the file
             async with aiofiles.open(full_path, mode, encoding="utf-8") as file:
                 await file.write(content)
+            notify_file_changed(full_path)
 
             return f"Content successfully saved to {full_path}"
         except Exception as e:
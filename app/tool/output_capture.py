@@ -0,0 +1,146 @@
+"""Bounded capture of command output for the shell tools."""
+
+import asyncio
+import codecs
+from typing import Callable, Optional
+
+
+READ_SIZE: int = 64 * 1024  # bytes
+
+
+class OutputCapture:
+    """
+    Keep the head and the tail of a byte stream in constant memory.
+
+    Bytes beyond the head window are streamed through a tail window and the
+    middle is discarded as it arrives, while the total byte and line counts of
+    the whole stream are still tracked. A window of None keeps everything.
+    """
+
+    def __init__(self, head_bytes: Optional[int] = 8000, tail_bytes: int = 8000):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self.total_lines = 0
+        self._ends_with_newline = True
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.total_bytes += len(data)
+        self.total_lines += data.count(b"\n")
+        self._ends_with_newline = data.endswith(b"\n")
+
+        if self.head_bytes is None:
+            self.head += data
+            return
+        if len(self.head) < self.head_bytes:
+            room = self.head_bytes - len(self.head)
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes:
+            self.tail += data
+            # Trim lazily so that a stream of small chunks does not memmove each time
+            if len(self.tail) > 2 * self.tail_bytes:
+                del self.tail[: len(self.tail) - self.tail_bytes]
+
+    @property
+    def lines(self) -> int:
+        """Number of lines seen, counting an unterminated last line."""
+        return self.total_lines + (0 if self._ends_with_newline else 1)
+
+    def _tail(self) -> bytes:
+        return bytes(self.tail[-self.tail_bytes :]) if self.tail_bytes else b""
+
+    @property
+    def omitted_bytes(self) -> int:
+        return self.total_bytes - len(self.head) - len(self._tail())
+
+    @property
+    def truncated(self) -> bool:
+        return self.head_bytes is not None and self.omitted_bytes > 0
+
+    def getvalue(self, marker: Optional[str] = None) -> str:
+        """
+        Return the captured text, with a marker where output was omitted.
+
+        Args:
+            marker: Text placed between head and tail when the stream was
+                truncated; defaults to a summary of what was dropped.
+        """
+        head = self.head.decode(errors="replace")
+        if not self.truncated:
+            return head + self._tail().decode(errors="replace")
+        if marker is None:
+            marker = (
+                f"\n[... {self.omitted_bytes} of {self.total_bytes} bytes omitted, "
+                f"{self.lines} lines in total ...]\n"
+            )
+        return head + marker + self._tail().decode(errors="replace")
+
+
+async def read_stream(
+    stream: asyncio.StreamReader,
+    capture: OutputCapture,
+    sentinel: Optional[bytes] = None,
+    on_output: Optional[Callable[[str], None]] = None,
+) -> bool:
+    """
+    Copy a stream into a capture as data arrives.
+
+    Reading stops at EOF or, if given, at the line holding the sentinel, which
+    is not captured.
+    Only the new bytes (plus a possible partial sentinel carried over from the
+    previous chunk) are searched for the sentinel.
+
+    Args:
+        stream: The stream to read.
+        capture: Where the output is kept.
+        sentinel: Marker that ends the output of interest.
+        on_output: Called with each piece of decoded output as it arrives.
+
+    Returns:
+        Whether the sentinel was found.
+    """
+    keep = len(sentinel) - 1 if sentinel else 0
+    carry = b""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def emit(data: bytes, final: bool = False) -> None:
+        capture.write(data)
+        if on_output:
+            text = decoder.decode(data, final)
+            if text:
+                on_output(text)
+
+    while True:
+        chunk = await stream.read(READ_SIZE)
+        if not chunk:
+            emit(carry, final=True)
+            return False
+        if not sentinel:
+            emit(chunk)
+            continue
+
+        data = carry + chunk
+        index = data.find(sentinel)
+        if index != -1:
+            emit(data[:index], final=True)
+            # Consume the rest of the sentinel's line, or its newline would be
+            # read as the start of the next command's output
+            if b"\n" not in data[index + len(sentinel) :]:
+                await stream.readline()
+            return True
+        # Hold back only a suffix that could be the start of the sentinel
+        held = next(
+            (
+                size
+                for size in range(min(keep, len(data)), 0, -1)
+                if sentinel.startswith(data[-size:])
+            ),
+            0,
+        )
+        emit(data[: len(data) - held])
+        carry = data[len(data) - held :]
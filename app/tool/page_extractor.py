@@ -0,0 +1,274 @@
+"""Goal-directed extraction of page content, one relevant chunk at a time."""
+
+import asyncio
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, List
+
+from app.llm import LLM
+from app.schema import Message
+
+
+EXTRACTION_PROMPT = """
+Your task is to extract the content of the page. You will be given a page and a goal, and you should extract all relevant information around this goal from the page.
+
+Examples of extraction goals:
+- Extract all company names
+- Extract specific descriptions
+- Extract all information about a topic
+- Extract links with companies in structured format
+- Extract all links
+
+If the goal is vague, summarize the page. Respond in JSON format.
+
+Extraction goal: {goal}
+
+Page content:
+{page}
+"""
+
+CHUNK_EXTRACTION_PROMPT = """
+Your task is to extract the content of one part of a page. You will be given the part and a goal, and you should extract all relevant information around this goal from it. Other parts of the page are handled separately, so do not guess what they contain.
+
+If the goal is vague, summarize this part. If this part holds nothing relevant to the goal, respond with {{}}. Respond in JSON format.
+
+Extraction goal: {goal}
+
+Page part {index} of {total}:
+{page}
+"""
+
+# Pieces scoring below this fraction of the best piece are not extracted
+MIN_RELATIVE_SCORE: float = 0.5
+
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+_TOKEN_RE = re.compile(r"\w+")
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+# Words of extraction goals that say what to do rather than what to look for
+_GOAL_STOPWORDS = set(
+    """
+    a about all an and any are as at by describe description details extract find
+    for from get how in info information is it list of on or page summarize that
+    the their this to what which with
+    """.split()
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def split_markdown(text: str, max_chars: int) -> List[str]:
+    """
+    Split markdown into sections at headings, and sections longer than
+    `max_chars` into runs of paragraphs.
+
+    Every piece is at most `max_chars` long; the pieces of a split section
+    repeat its heading so that they still say what they are about.
+    """
+    sections: List[List[str]] = [[]]
+    for line in text.splitlines():
+        if _HEADING_RE.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+
+    pieces = []
+    for lines in sections:
+        section = "\n".join(lines).strip()
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+
+        heading = lines[0] if _HEADING_RE.match(lines[0]) else ""
+        current = ""
+        for paragraph in re.split(r"\n\s*\n", section):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if current not in ("", heading) and (
+                len(current) + len(paragraph) + 2 > max_chars
+            ):
+                pieces.append(current)
+                current = heading
+            while len(current) + len(paragraph) + 2 > max_chars:
+                room = max(max_chars - len(current) - 2, max_chars // 2)
+                pieces.append(f"{current}\n\n{paragraph[:room]}".strip())
+                current, paragraph = heading, paragraph[room:]
+            current = f"{current}\n\n{paragraph}".strip()
+        if current and current != heading:
+            pieces.append(current)
+    return pieces
+
+
+def bm25_scores(
+    documents: List[str], query: str, k1: float = 1.5, b: float = 0.75
+) -> List[float]:
+    """Okapi BM25 relevance of each document to a query."""
+    terms = [t for t in set(_tokenize(query)) if t not in _GOAL_STOPWORDS]
+    if not terms or not documents:
+        return [0.0] * len(documents)
+
+    counts = [Counter(_tokenize(document)) for document in documents]
+    lengths = [sum(c.values()) for c in counts]
+    average = sum(lengths) / len(lengths) or 1.0
+    frequencies = {t: sum(1 for c in counts if t in c) for t in terms}
+
+    scores = []
+    for c, length in zip(counts, lengths):
+        score = 0.0
+        for term in terms:
+            tf = c.get(term, 0)
+            if not tf:
+                continue
+            n = frequencies[term]
+            idf = math.log(1 + (len(documents) - n + 0.5) / (n + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+        scores.append(score)
+    return scores
+
+
+def select_chunks(
+    pieces: List[str], goal: str, chunk_chars: int, max_chunks: int
+) -> List[str]:
+    """
+    Pick the pieces most relevant to the goal and pack them into chunks.
+
+    Pieces are ranked by BM25 against the goal and taken until `max_chunks`
+    chunks of `chunk_chars` are filled; pieces scoring below
+    `MIN_RELATIVE_SCORE` of the best one are left out. If no piece matches at all (a vague goal), the page is
+    taken from the top. Chosen pieces keep their page order.
+    """
+    scores = bm25_scores(pieces, goal)
+    if any(scores):
+        threshold = max(scores) * MIN_RELATIVE_SCORE
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score >= threshold),
+            key=lambda i: -scores[i],
+        )
+    else:
+        ranked = list(range(len(pieces)))
+
+    budget = chunk_chars * max_chunks
+    chosen, used = [], 0
+    for i in ranked:
+        if used + len(pieces[i]) > budget:
+            continue
+        chosen.append(i)
+        used += len(pieces[i]) + 2
+
+    chunks: List[str] = []
+    current = ""
+    for i in sorted(chosen):
+        if current and len(current) + len(pieces[i]) + 2 > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{pieces[i]}" if current else pieces[i]
+    if current:
+        chunks.append(current)
+    return chunks[:max_chunks]
+
+
+_UNPARSED = object()
+
+
+def _parse_json(text: str) -> Any:
+    text = text.strip()
+    match = _FENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return _UNPARSED
+
+
+def _merge_values(values: List[Any]) -> Any:
+    if all(isinstance(v, dict) for v in values):
+        merged: dict = {}
+        for value in values:
+            for key, item in value.items():
+                merged.setdefault(key, []).append(item)
+        return {key: _merge_values(items) for key, items in merged.items()}
+
+    items = []
+    for value in values:
+        items.extend(value if isinstance(value, list) else [value])
+    unique, seen = [], set()
+    for item in items:
+        marker = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+        if marker not in seen:
+            seen.add(marker)
+            unique.append(item)
+    if len(unique) == 1 and not any(isinstance(v, list) for v in values):
+        return unique[0]
+    return unique
+
+
+def merge_extractions(results: List[str]) -> str:
+    """
+    Combine the extractions of several chunks into one answer.
+
+    JSON results are merged key by key, with lists concatenated and repeated
+    items dropped; empty results are skipped and anything that is not JSON
+    is appended as is.
+    """
+    values, texts = [], []
+    for result in results:
+        value = _parse_json(result)
+        if value is _UNPARSED:
+            if result.strip():
+                texts.append(result.strip())
+        elif value not in ({}, [], None, ""):
+            values.append(value)
+
+    if len(values) + len(texts) == 1:
+        return json.dumps(values[0], ensure_ascii=False) if values else texts[0]
+    parts = []
+    if values:
+        parts.append(json.dumps(_merge_values(values), indent=2, ensure_ascii=False))
+    parts.extend(texts)
+    return "\n\n".join(parts) or "{}"
+
+
+async def extract_page_content(
+    llm: LLM,
+    goal: str,
+    content: str,
+    chunk_chars: int = 8000,
+    max_chunks: int = 8,
+    concurrency: int = 4,
+) -> str:
+    """
+    Extract what a goal asks for from page content.
+
+    A page that fits in one chunk is sent as is. A longer page is split at
+    headings and paragraphs into pieces of a quarter chunk, only the pieces
+    relevant to the goal are kept and packed back into chunks
+    (see `select_chunks`), each chunk is extracted by its own LLM call, with at
+    most `concurrency` calls in flight, and the results are merged.
+    """
+    if len(content) <= chunk_chars:
+        prompt = EXTRACTION_PROMPT.format(goal=goal, page=content)
+        return await llm.ask([Message.user_message(prompt)])
+
+    # Pieces smaller than a chunk let the ranking skip irrelevant paragraphs
+    pieces = split_markdown(content, max(500, chunk_chars // 4))
+    chunks = select_chunks(pieces, goal, chunk_chars, max_chunks)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def extract(index: int, chunk: str) -> str:
+        prompt = CHUNK_EXTRACTION_PROMPT.format(
+            goal=goal, index=index, total=len(chunks), page=chunk
+        )
+        async with semaphore:
+            return await llm.ask([Message.user_message(prompt)], stream=False)
+
+    results = await asyncio.gather(
+        *(extract(i, chunk) for i, chunk in enumerate(chunks, 1))
+    )
+    return merge_extractions(results)
@@ -1,18 +1,18 @@
-import multiprocessing
-import sys
-from io import StringIO
-from typing import Dict
-
+import uuid
+from typing import Dict, Optional
 
+from pydantic import Field
 
+from app.config import PythonExecuteSettings, config
 from app.tool.base import BaseTool
+from app.tool.python_worker import get_worker_pool
 
 
 class PythonExecute(BaseTool):
     """A tool for executing Python code with timeout and safety restrictions."""
 
     name: str = "python_execute"
-    description: str = "Executes Python code string. Note: Only print outputs are visible, function return values are not captured. Use print statements to see results."
+    description: str = "Executes Python code string. Note: Only print outputs are visible, function return values are not captured. Use print statements to see results. If persistent sessions are enabled, variables and imports are kept between calls; set `reset` to start over."
     parameters: dict = {
         "type": "object",
         "properties": {
@@ -20,30 +20,24 @@ class PythonExecute(BaseTool):
                 "type": "string",
                 "description": "The Python code to execute.",
             },
+            "reset": {
+                "type": "boolean",
+                "description": "(optional) Clear the persistent Python session before running `code`.",
+                "default": False,
+            },
         },
         "required": ["code"],
     }
 
-    def _run_code(self, code: str, result_dict: dict, safe_globals: dict) -> None:
-        original_stdout = sys.stdout
-        try:
-            output_buffer = StringIO()
-            sys.stdout = output_buffer
-            print("python execute before 1111...")
-            exec(code, safe_globals, safe_globals)
-            print("python execute after 1111...")
-            result_dict["observation"] = output_buffer.getvalue()
-            result_dict["success"] = True
-        except Exception as e:
-            result_dict["observation"] = str(e)
-            result_dict["success"] = False
-        finally:
-            sys.stdout = original_stdout
+    # Keep one namespace across calls; None follows the [python_execute] config
+    persistent: Optional[bool] = None
+    session_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
 
     async def execute(
         self,
         code: str,
         timeout: int = 30,
+        reset: bool = False,
     ) -> Dict:
         """
         Executes the provided Python code with a timeout.
@@ -51,32 +45,30 @@ class PythonExecute(BaseTool):
         Args:
             code (str): The Python code to execute.
             timeout (int): Execution timeout in seconds.
+            reset (bool): Clear the persistent session before running the code.
 
         Returns:
             Dict: Contains 'output' with execution output or error message and 'success' status.
         """
+        settings = config.python_execute_config or PythonExecuteSettings()
+        pool = get_worker_pool(
+            size=settings.pool_size,
+            preload_modules=settings.preload_modules,
+            max_tasks_per_worker=settings.max_tasks_per_worker,
+        )
 
+        persistent = (
+            self.persistent if self.persistent is not None else settings.persistent
+        )
+        if not persistent:
+            return await pool.run(code, timeout)
 
+        if reset:
+            await pool.reset_kernel(self.session_id)
+            if not code.strip():
+                return {"observation": "Python session has been reset", "success": True}
 
-        with multiprocessing.Manager() as manager:
-            result = manager.dict({"observation": "", "success": False})
-            if isinstance(__builtins__, dict):
-                safe_globals = {"__builtins__": __builtins__}
-            else:
-                safe_globals = {"__builtins__": __builtins__.__dict__.copy()}
-            proc = multiprocessing.Process(
-                target=self._run_code, args=(code, result, safe_globals)
-            )
-
-            proc.start()
-            proc.join(timeout)
-
-            # timeout process
-            if proc.is_alive():
-                proc.terminate()
-                proc.join(1)
-                return {
-                    "observation": f"Execution timeout after {timeout} seconds",
-                    "success": False,
-                }
-            return dict(result)
+        kernel = pool.get_kernel(
+            self.session_id, settings.idle_timeout, settings.memory_limit_mb
+        )
+        return await kernel.run(code, timeout)
@@ -0,0 +1,376 @@
+"""Pre-forked worker processes for running Python code snippets."""
+
+import asyncio
+import builtins
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import weakref
+from io import StringIO
+from typing import Dict, List, MutableMapping, Optional
+
+
+def _run_code(code: str, namespace: Optional[dict] = None) -> Dict:
+    """Execute code in the given or a fresh namespace, capturing what it prints."""
+    original_stdout = sys.stdout
+    output_buffer = StringIO()
+    safe_globals = namespace if namespace is not None else {"__builtins__": builtins}
+    try:
+        sys.stdout = output_buffer
+        exec(code, safe_globals, safe_globals)
+        return {"observation": output_buffer.getvalue(), "success": True}
+    except Exception as e:
+        return {"observation": str(e) or type(e).__name__, "success": False}
+    finally:
+        sys.stdout = original_stdout
+
+
+def _restore(mapping: MutableMapping, saved: dict) -> None:
+    """Put a mapping back to a saved copy of itself."""
+    for key in [key for key in mapping if key not in saved]:
+        del mapping[key]
+    for key, value in saved.items():
+        if key not in mapping or mapping[key] is not value:
+            mapping[key] = value
+
+
+def _run_isolated(code: str) -> Dict:
+    """
+    Execute code in a fresh namespace and undo its changes to the process.
+
+    The working directory, environment, `sys.path` and the attributes of `sys`
+    and `builtins` are restored afterwards. Modules the code imported and
+    threads it left running cannot be undone safely, so the result is marked
+    `dirty` and the pool replaces the worker.
+    """
+    cwd = os.getcwd()
+    environ = dict(os.environ)
+    path = list(sys.path)
+    modules = set(sys.modules)
+    sys_attrs = dict(vars(sys))
+    builtin_attrs = dict(vars(builtins))
+    dirty = False
+    try:
+        result = _run_code(code, {"__builtins__": dict(builtin_attrs)})
+    finally:
+        _restore(vars(sys), sys_attrs)
+        _restore(vars(builtins), builtin_attrs)
+        sys.path[:] = path
+        _restore(os.environ, environ)
+        try:
+            os.chdir(cwd)
+        except OSError:
+            dirty = True
+    result["dirty"] = (
+        dirty or bool(set(sys.modules) - modules) or threading.active_count() > 1
+    )
+    return result
+
+
+def _log_spawn_failure(error: BaseException) -> None:
+    # Imported here: workers import this module and must not set up logging
+    from app.logger import logger
+
+    logger.warning(f"Failed to start a Python worker: {error}")
+
+
+def _limit_memory(memory_limit_mb: int) -> None:
+    """Cap the address space of the current process, where the OS supports it."""
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(
+    conn, persistent: bool = False, memory_limit_mb: Optional[int] = None
+) -> None:
+    """Run code received over the pipe until the parent closes it."""
+    if memory_limit_mb:
+        _limit_memory(memory_limit_mb)
+    # A persistent worker keeps one namespace, so variables and imports survive
+    namespace = {"__builtins__": builtins} if persistent else None
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, OSError):
+            break
+        if persistent:
+            conn.send(_run_code(code, namespace))
+        else:
+            conn.send(_run_isolated(code))
+
+
+class _Worker:
+    """A sandbox process connected to the pool through a pipe."""
+
+    def __init__(
+        self, ctx, persistent: bool = False, memory_limit_mb: Optional[int] = None
+    ):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, persistent, memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.join(1)
+        finally:
+            self.conn.close()
+
+
+class PythonKernel:
+    """
+    A long-lived worker whose namespace survives across calls.
+
+    The worker is started lazily and restarted after a timeout, a crash or a
+    reset, which discards all session state.
+    """
+
+    def __init__(self, ctx, memory_limit_mb: Optional[int] = None):
+        self._ctx = ctx
+        self.memory_limit_mb = memory_limit_mb
+        self._worker: Optional[_Worker] = None
+        self._lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    async def run(self, code: str, timeout: float) -> Dict:
+        """Execute code in the session namespace and return its observation."""
+        async with self._lock:
+            self.last_used = time.monotonic()
+            if self._worker is None or not self._worker.is_alive():
+                self.close()
+                self._worker = await asyncio.to_thread(
+                    _Worker, self._ctx, True, self.memory_limit_mb
+                )
+
+            finished = False
+            try:
+                self._worker.conn.send(code)
+                ready = await asyncio.to_thread(self._worker.conn.poll, timeout)
+                if not ready:
+                    return {
+                        "observation": f"Execution timeout after {timeout} seconds, the Python session was restarted and its variables were lost",
+                        "success": False,
+                    }
+                result = self._worker.conn.recv()
+                finished = True
+                return result
+            except (EOFError, OSError):
+                return {
+                    "observation": "Python session exited unexpectedly (e.g. it exceeded its memory limit) and its variables were lost",
+                    "success": False,
+                }
+            except Exception as e:
+                # e.g. pickle.UnpicklingError from a corrupted pipe
+                return {
+                    "observation": f"Python session returned an unreadable result ({e}), it was restarted and its variables were lost",
+                    "success": False,
+                }
+            finally:
+                self.last_used = time.monotonic()
+                if not finished:
+                    self.close()
+
+    async def reset(self) -> None:
+        """Discard the session namespace by stopping the worker."""
+        async with self._lock:
+            self.close()
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.kill()
+            self._worker = None
+
+
+class PythonWorkerPool:
+    """
+    A pool of warm worker processes for PythonExecute.
+
+    Workers are started once (from a forkserver where available, with optional
+    preloaded modules) and receive code over a pipe, so a call no longer pays
+    for a Manager server and a fresh process. Results are awaited without
+    blocking the event loop. Each snippet runs in a fresh namespace and its
+    changes to the process are undone (see `_run_isolated`). A worker that
+    times out, crashes, could not be cleaned up or has served
+    `max_tasks_per_worker` snippets is replaced by a fresh one.
+
+    The idle queue holds `None` for a worker that failed to start; whoever
+    takes it starts one itself, so a failed spawn neither shrinks the pool
+    nor leaves callers waiting forever.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        preload_modules: Optional[List[str]] = None,
+        max_tasks_per_worker: int = 50,
+    ):
+        self.size = max(1, size)
+        self.max_tasks_per_worker = max_tasks_per_worker
+
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._ctx = multiprocessing.get_context("forkserver")
+            self._ctx.set_forkserver_preload([__name__, *(preload_modules or [])])
+        else:
+            self._ctx = multiprocessing.get_context("spawn")
+
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._pending: set = set()
+        self._kernels: Dict[str, PythonKernel] = {}
+
+    async def _spawn(self) -> _Worker:
+        return await asyncio.to_thread(_Worker, self._ctx)
+
+    async def start(self) -> None:
+        """Start all workers ahead of the first call."""
+        async with self._start_lock:
+            if self._started:
+                return
+            workers = await asyncio.gather(
+                *(self._spawn() for _ in range(self.size)), return_exceptions=True
+            )
+            for worker in workers:
+                if isinstance(worker, BaseException):
+                    _log_spawn_failure(worker)
+                    worker = None
+                self._idle.put_nowait(worker)
+            self._started = True
+
+    async def run(self, code: str, timeout: float) -> Dict:
+        """Execute code on an idle worker and return its observation."""
+        if not self._started:
+            await self.start()
+
+        worker = await self._idle.get()
+        if worker is None or not worker.is_alive():
+            if worker is not None:
+                worker.kill()
+            try:
+                worker = await self._spawn()
+            except BaseException as e:
+                # Hand the empty slot to the next caller, which tries again
+                self._idle.put_nowait(None)
+                if not isinstance(e, Exception):
+                    raise
+                return {
+                    "observation": f"Failed to start a Python worker: {e}",
+                    "success": False,
+                }
+
+        # Anything but a clean result (timeout, crash, cancellation) recycles the worker
+        recycle = True
+        try:
+            worker.conn.send(code)
+            ready = await asyncio.to_thread(worker.conn.poll, timeout)
+            if not ready:
+                return {
+                    "observation": f"Execution timeout after {timeout} seconds",
+                    "success": False,
+                }
+
+            result = worker.conn.recv()
+            worker.tasks += 1
+            recycle = (
+                result.pop("dirty", False) or worker.tasks >= self.max_tasks_per_worker
+            )
+            return result
+        except (EOFError, OSError):
+            return {
+                "observation": "Python worker exited unexpectedly while executing code",
+                "success": False,
+            }
+        except Exception as e:
+            # e.g. pickle.UnpicklingError from a corrupted pipe
+            return {
+                "observation": f"Python worker returned an unreadable result: {e}",
+                "success": False,
+            }
+        finally:
+            if recycle:
+                # Replace the worker in the background so the result is not delayed
+                worker.kill()
+                task = asyncio.create_task(self._replace())
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+            else:
+                self._idle.put_nowait(worker)
+
+    async def _replace(self) -> None:
+        try:
+            worker = await self._spawn()
+        except Exception as e:
+            _log_spawn_failure(e)
+            worker = None
+        self._idle.put_nowait(worker)
+
+    def get_kernel(
+        self,
+        session_id: str,
+        idle_timeout: float,
+        memory_limit_mb: Optional[int] = None,
+    ) -> PythonKernel:
+        """Return the persistent kernel of a session, evicting idle ones first."""
+        now = time.monotonic()
+        for key, kernel in list(self._kernels.items()):
+            if (
+                key != session_id
+                and not kernel._lock.locked()
+                and now - kernel.last_used > idle_timeout
+            ):
+                kernel.close()
+                del self._kernels[key]
+
+        if session_id not in self._kernels:
+            self._kernels[session_id] = PythonKernel(self._ctx, memory_limit_mb)
+        return self._kernels[session_id]
+
+    async def reset_kernel(self, session_id: str) -> None:
+        """Drop all state of a session's persistent kernel."""
+        kernel = self._kernels.get(session_id)
+        if kernel:
+            await kernel.reset()
+
+    def close(self) -> None:
+        """Stop all idle workers and persistent kernels."""
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None:
+                worker.kill()
+        for kernel in self._kernels.values():
+            kernel.close()
+        self._kernels.clear()
+        self._started = False
+
+
+# One pool per event loop, since asyncio primitives are bound to their loop
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PythonWorkerPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_worker_pool(
+    size: int = 2,
+    preload_modules: Optional[List[str]] = None,
+    max_tasks_per_worker: int = 50,
+) -> PythonWorkerPool:
+    """Return the worker pool of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        _pools[loop] = PythonWorkerPool(size, preload_modules, max_tasks_per_worker)
+    return _pools[loop]
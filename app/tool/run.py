@@ -2,6 +2,8 @@
 
 import asyncio
 
+from app.tool.output_capture import OutputCapture, read_stream
+
 
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
 MAX_RESPONSE_LEN: int = 16000
@@ -26,12 +28,22 @@ async def run(
         cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
     )
 
+    # Only the first `truncate_after` bytes of each stream are kept in memory
+    stdout = OutputCapture(head_bytes=truncate_after or None, tail_bytes=0)
+    stderr = OutputCapture(head_bytes=truncate_after or None, tail_bytes=0)
+
+    async def communicate():
+        await asyncio.gather(
+            read_stream(process.stdout, stdout), read_stream(process.stderr, stderr)
+        )
+        await process.wait()
+
     try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        await asyncio.wait_for(communicate(), timeout=timeout)
         return (
             process.returncode or 0,
-            maybe_truncate(stdout.decode(), truncate_after=truncate_after),
-            maybe_truncate(stderr.decode(), truncate_after=truncate_after),
+            stdout.getvalue(marker="") + (TRUNCATED_MESSAGE if stdout.truncated else ""),
+            stderr.getvalue(marker="") + (TRUNCATED_MESSAGE if stderr.truncated else ""),
         )
     except asyncio.TimeoutError as exc:
         try:
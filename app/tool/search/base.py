@@ -9,7 +9,8 @@ class WebSearchEngine(object):
             query (str): The search query to submit to the search engine.
             num_results (int, optional): The number of search results to return. Default is 10.
             args: Additional arguments.
-            kwargs: Additional keyword arguments.
+            kwargs: Additional keyword arguments, e.g. `timeout` in seconds for
+                each request, honored by engines whose client supports it.
 
         Returns:
             List: A list of dict matching the search query.
@@ -4,6 +4,6 @@ from app.tool.search.base import WebSearchEngine
 
 
 class GoogleSearchEngine(WebSearchEngine):
-    def perform_search(self, query, num_results=10, *args, **kwargs):
+    def perform_search(self, query, num_results=10, *args, timeout=5, **kwargs):
         """Google search engine."""
-        return search(query, num_results=num_results)
+        return search(query, num_results=num_results, timeout=timeout)
@@ -1,11 +1,30 @@
-from collections import defaultdict
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
 from pathlib import Path
-from typing import Literal, get_args
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Tuple,
+    get_args,
+)
+
+from pydantic import PrivateAttr
 
 from app.exceptions import ToolError
 from app.tool import BaseTool
 from app.tool.base import CLIResult, ToolResult
-from app.tool.run import run
+from app.tool.code_search import notify_file_changed
+from app.tool.workspace_index import get_workspace_index
 
 
 Command = Literal[
@@ -16,14 +35,26 @@ Command = Literal[
     "undo_edit",
 ]
 SNIPPET_LINES: int = 4
+# Entries listed per directory when viewing a directory
+MAX_DIR_ENTRIES: int = 100
 
 MAX_RESPONSE_LEN: int = 16000
 
+# Files at least this large are viewed and edited without loading them whole
+LARGE_FILE_SIZE: int = 8 * 1024 * 1024
+# A line index counts the newlines before every block of this many bytes
+INDEX_BLOCK_SIZE: int = 64 * 1024
+CHUNK_SIZE: int = 4 * 1024 * 1024
+# Enough bytes to fill a truncated response, as a character takes at most 4
+MAX_RESPONSE_BYTES: int = (MAX_RESPONSE_LEN + 1) * 4
+# Undo history of all files is kept within this many bytes
+MAX_HISTORY_BYTES: int = 32 * 1024 * 1024
+
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
 
 _STR_REPLACE_EDITOR_DESCRIPTION = """Custom editing tool for viewing, creating and editing files
 * State is persistent across command calls and discussions with the user
-* If `path` is a file, `view` displays the result of applying `cat -n`. If `path` is a directory, `view` lists non-hidden files and directories up to 2 levels deep
+* If `path` is a file, `view` displays the result of applying `cat -n`. If `path` is a directory, `view` lists non-hidden, non-git-ignored files and directories up to 2 levels deep
 * The `create` command cannot be used if the specified `path` already exists as a file
 * If a `command` generates a long output, it will be truncated and marked with `<response clipped>`
 * The `undo_edit` command will revert the last edit made to the file at `path`
@@ -44,11 +75,175 @@ def maybe_truncate(content: str, truncate_after: int | None = MAX_RESPONSE_LEN):
     )
 
 
+class _Splice(NamedTuple):
+    """Reverse diff of an edit: `length` bytes at `offset` replaced `old`."""
+
+    offset: int
+    length: int
+    old: bytes
+    # Size of the file right after the edit, to detect later outside changes
+    size: int
+
+
+class _HistoryBudget:
+    """
+    Byte budget shared by the undo histories of all editors.
+
+    When it is exceeded, the oldest edits of the least recently edited file
+    are forgotten first, whichever editor made them, so recent edits always
+    stay undoable.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # (history, path) undo stacks, least recently edited first
+        self._order: "OrderedDict[Tuple[int, Path], weakref.ref]" = OrderedDict()
+
+    def charge(self, history: "_EditHistory", path: Path, cost: int) -> None:
+        """Account for an edit pushed onto a stack and evict to stay in budget."""
+        key = (id(history), path)
+        self._order[key] = weakref.ref(history)
+        self._order.move_to_end(key)
+        self.size += cost
+        while self.size > self.max_bytes and self._order:
+            (_, oldest_path), ref = next(iter(self._order.items()))
+            freed, emptied = ref()._drop_oldest(oldest_path)
+            self.size -= freed
+            if emptied:
+                self._order.popitem(last=False)
+
+    def refund(self, history: "_EditHistory", path: Path, cost: int) -> None:
+        """Account for an edit popped from a stack."""
+        self.size -= cost
+        if path not in history._stacks:
+            self._order.pop((id(history), path), None)
+
+    def release(self, history: "_EditHistory") -> None:
+        """Forget every stack of a history that is going away."""
+        for path in history._stacks:
+            self._order.pop((id(history), path), None)
+        self.size -= history.size
+
+
+class _EditHistory:
+    """Undo stacks of reverse diffs for the files edited by one editor."""
+
+    def __init__(self, budget: _HistoryBudget):
+        self.budget = budget
+        self.size = 0
+        self._stacks: Dict[Path, List[_Splice]] = {}
+
+    def __del__(self):
+        self.budget.release(self)
+
+    @staticmethod
+    def _cost(splice: _Splice) -> int:
+        return len(splice.old) + 64
+
+    def push(self, path: Path, splice: _Splice) -> None:
+        self._stacks.setdefault(path, []).append(splice)
+        cost = self._cost(splice)
+        self.size += cost
+        self.budget.charge(self, path, cost)
+
+    def pop(self, path: Path) -> Optional[_Splice]:
+        stack = self._stacks.get(path)
+        if not stack:
+            return None
+        splice = stack.pop()
+        if not stack:
+            del self._stacks[path]
+        cost = self._cost(splice)
+        self.size -= cost
+        self.budget.refund(self, path, cost)
+        return splice
+
+    def forget(self, path: Path) -> None:
+        """Forget every edit of a file."""
+        stack = self._stacks.pop(path, None)
+        if stack:
+            cost = sum(self._cost(splice) for splice in stack)
+            self.size -= cost
+            self.budget.refund(self, path, cost)
+
+    def _drop_oldest(self, path: Path) -> Tuple[int, bool]:
+        """Forget the oldest edit of a file; return its cost and if none is left."""
+        stack = self._stacks[path]
+        cost = self._cost(stack.pop(0))
+        self.size -= cost
+        if not stack:
+            del self._stacks[path]
+        return cost, not stack
+
+
+# Shared by all editors, so the byte budget holds for the whole process
+_history_budget = _HistoryBudget(MAX_HISTORY_BYTES)
+
+
+class _LineIndex:
+    """
+    Sparse line index of a file.
+
+    It stores how many newlines precede each `INDEX_BLOCK_SIZE` block of the
+    file, so finding a line start is a binary search for its block followed by
+    a scan of that block alone.
+    """
+
+    def __init__(self, path: Path):
+        stat = path.stat()
+        self.key = (stat.st_mtime_ns, stat.st_size)
+        self.block_lines = array("q")
+
+        newlines = 0
+        # Read whole blocks so that every block starts at a multiple of the size
+        read_size = max(1, CHUNK_SIZE // INDEX_BLOCK_SIZE) * INDEX_BLOCK_SIZE
+        with open(path, "rb") as f:
+            while chunk := f.read(read_size):
+                for start in range(0, len(chunk), INDEX_BLOCK_SIZE):
+                    self.block_lines.append(newlines)
+                    newlines += chunk.count(b"\n", start, start + INDEX_BLOCK_SIZE)
+        self.n_lines = newlines + 1
+
+    def line_start(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset where the 0-based `line` starts."""
+        if line == 0:
+            return 0
+        # The block holding the line-th newline is the last one preceded by fewer
+        block = bisect_left(self.block_lines, line) - 1
+        offset = block * INDEX_BLOCK_SIZE
+        for _ in range(line - self.block_lines[block]):
+            offset = mm.find(b"\n", offset) + 1
+        return offset
+
+
+def _lines_near(mm: mmap.mmap, anchor: int, before: int, count: int) -> Tuple[int, int]:
+    """Byte range of `count` lines starting `before` lines above the line of `anchor`."""
+    start = mm.rfind(b"\n", 0, anchor) + 1
+    for _ in range(before):
+        if start == 0:
+            break
+        start = mm.rfind(b"\n", 0, start - 1) + 1
+    end = start
+    for _ in range(count):
+        newline = mm.find(b"\n", end)
+        if newline == -1:
+            return start, len(mm)
+        end = newline + 1
+    return start, end - 1
+
+
+def _expand_tabs(data: bytes) -> bytes:
+    # Only data with tabs needs decoding to expand them
+    return data.decode().expandtabs().encode() if b"\t" in data else data
+
+
 class StrReplaceEditor(BaseTool):
     """A tool for executing bash commands"""
 
     name: str = "str_replace_editor"
     description: str = _STR_REPLACE_EDITOR_DESCRIPTION
+    exclusive: bool = True
     parameters: dict = {
         "type": "object",
         "properties": {
@@ -86,7 +281,13 @@ class StrReplaceEditor(BaseTool):
         "required": ["command", "path"],
     }
 
-    _file_history: list = defaultdict(list)
+    # Undo history of this editor; only its byte budget is shared
+    _file_history: _EditHistory = PrivateAttr(
+        default_factory=lambda: _EditHistory(_history_budget)
+    )
+    # Line indexes of large files, validated against their mtime and size
+    _line_indexes: OrderedDict = OrderedDict()
+    _max_line_indexes: int = 32
 
     async def execute(
         self,
@@ -108,7 +309,7 @@ class StrReplaceEditor(BaseTool):
             if file_text is None:
                 raise ToolError("Parameter `file_text` is required for command: create")
             self.write_file(_path, file_text)
-            self._file_history[_path].append(file_text)
+            self._record_edit(_path, 0, 0, b"")
             result = ToolResult(output=f"File created successfully at: {_path}")
         elif command == "str_replace":
             if old_str is None:
@@ -130,6 +331,8 @@ class StrReplaceEditor(BaseTool):
             raise ToolError(
                 f'Unrecognized command {command}. The allowed commands for the {self.name} tool are: {", ".join(get_args(Command))}'
             )
+        if command != "view":
+            notify_file_changed(str(_path))
         return str(result)
 
     def validate_path(self, command: str, path: Path):
@@ -166,12 +369,24 @@ class StrReplaceEditor(BaseTool):
                     "The `view_range` parameter is not allowed when `path` points to a directory."
                 )
 
-            _, stdout, stderr = await run(
-                rf"find {path} -maxdepth 2 -not -path '*/\.*'"
-            )
-            if not stderr:
-                stdout = f"Here's the files and directories up to 2 levels deep in {path}, excluding hidden items:\n{stdout}\n"
-            return CLIResult(output=stdout, error=stderr)
+            try:
+                lines = [str(path)]
+                for entry in get_workspace_index().walk(
+                    str(path), max_depth=2, max_entries_per_dir=MAX_DIR_ENTRIES
+                ):
+                    lines.append(
+                        f"{entry.path}/... ({entry.omitted} more entries)"
+                        if entry.omitted
+                        else entry.path
+                    )
+            except OSError as e:
+                return CLIResult(output="", error=str(e))
+            stdout = maybe_truncate("\n".join(lines) + "\n")
+            stdout = f"Here's the files and directories up to 2 levels deep in {path}, excluding hidden and git-ignored items:\n{stdout}\n"
+            return CLIResult(output=stdout)
+
+        if self._is_large(path):
+            return self._view_large(path, view_range)
 
         file_content = self.read_file(path)
         init_line = 1
@@ -207,8 +422,14 @@ class StrReplaceEditor(BaseTool):
 
     def str_replace(self, path: Path, old_str: str, new_str: str | None):
         """Implement the str_replace command, which replaces old_str with new_str in the file content"""
+        if self._is_large(path):
+            return self._str_replace_large(path, old_str, new_str)
+
         # Read the file content
         file_content = self.read_file(path).expandtabs()
+        before = path.read_bytes()
+        if before == file_content.encode():
+            before = None
         old_str = old_str.expandtabs()
         new_str = new_str.expandtabs() if new_str is not None else ""
 
@@ -235,8 +456,9 @@ class StrReplaceEditor(BaseTool):
         # Write the new content to the file
         self.write_file(path, new_file_content)
 
-        # Save the content to history
-        self._file_history[path].append(file_content)
+        # Save the reverse diff to history
+        offset = len(file_content[: file_content.index(old_str)].encode())
+        self._record_edit(path, offset, len(new_str.encode()), old_str.encode(), before)
 
         # Create a snippet of the edited section
         replacement_line = file_content.split(old_str)[0].count("\n")
@@ -255,7 +477,13 @@ class StrReplaceEditor(BaseTool):
 
     def insert(self, path: Path, insert_line: int, new_str: str):
         """Implement the insert command, which inserts new_str at the specified line in the file content."""
+        if self._is_large(path):
+            return self._insert_large(path, insert_line, new_str)
+
         file_text = self.read_file(path).expandtabs()
+        before = path.read_bytes()
+        if before == file_text.encode():
+            before = None
         new_str = new_str.expandtabs()
         file_text_lines = file_text.split("\n")
         n_lines_file = len(file_text_lines)
@@ -281,7 +509,14 @@ class StrReplaceEditor(BaseTool):
         snippet = "\n".join(snippet_lines)
 
         self.write_file(path, new_file_text)
-        self._file_history[path].append(file_text)
+        # Before the last line the text goes in front of the next line, else it is appended
+        if insert_line < n_lines_file:
+            offset = len("\n".join(file_text_lines[:insert_line]).encode())
+            offset += 1 if insert_line else 0
+            self._record_edit(path, offset, len((new_str + "\n").encode()), b"", before)
+        else:
+            offset = len(file_text.encode())
+            self._record_edit(path, offset, len(("\n" + new_str).encode()), b"", before)
 
         success_msg = f"The file {path} has been edited. "
         success_msg += self._make_output(
@@ -294,16 +529,328 @@ class StrReplaceEditor(BaseTool):
 
     def undo_edit(self, path: Path):
         """Implement the undo_edit command."""
-        if not self._file_history[path]:
+        splice = self._file_history.pop(path)
+        if splice is None:
             raise ToolError(f"No edit history found for {path}.")
 
-        old_text = self._file_history[path].pop()
-        self.write_file(path, old_text)
+        try:
+            self._apply_splice(path, splice)
+        except ToolError:
+            self._file_history.push(path, splice)
+            raise
+        old_text = (
+            self._read_head(path) if self._is_large(path) else self.read_file(path)
+        )
 
         return CLIResult(
             output=f"Last edit to {path} undone successfully. {self._make_output(old_text, str(path))}"
         )
 
+    def _is_large(self, path: Path) -> bool:
+        return path.stat().st_size >= LARGE_FILE_SIZE
+
+    def _line_index(self, path: Path) -> _LineIndex:
+        """Return the line index of a file, rebuilding it if the file changed."""
+        stat = path.stat()
+        index = self._line_indexes.get(path)
+        if index is None or index.key != (stat.st_mtime_ns, stat.st_size):
+            index = _LineIndex(path)
+            self._line_indexes[path] = index
+        self._line_indexes.move_to_end(path)
+        while len(self._line_indexes) > self._max_line_indexes:
+            self._line_indexes.popitem(last=False)
+        return index
+
+    def _read_head(self, path: Path) -> str:
+        """Read as much of the start of a file as a response can show."""
+        with open(path, "rb") as f:
+            return f.read(MAX_RESPONSE_BYTES).decode(errors="replace")
+
+    def _view_large(self, path: Path, view_range: list[int] | None):
+        """View a large file, reading only the requested lines through mmap."""
+        if not view_range:
+            return CLIResult(output=self._make_output(self._read_head(path), str(path)))
+
+        if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
+            raise ToolError(
+                "Invalid `view_range`. It should be a list of two integers."
+            )
+        index = self._line_index(path)
+        n_lines_file = index.n_lines
+        init_line, final_line = view_range
+        if init_line < 1 or init_line > n_lines_file:
+            raise ToolError(
+                f"Invalid `view_range`: {view_range}. Its first element `{init_line}` should be within the range of lines of the file: {[1, n_lines_file]}"
+            )
+        if final_line > n_lines_file:
+            raise ToolError(
+                f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be smaller than the number of lines in the file: `{n_lines_file}`"
+            )
+        if final_line != -1 and final_line < init_line:
+            raise ToolError(
+                f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be larger or equal than its first `{init_line}`"
+            )
+
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            start = index.line_start(mm, init_line - 1)
+            if final_line == -1 or final_line == n_lines_file:
+                end = len(mm)
+            else:
+                end = index.line_start(mm, final_line) - 1
+            end = min(end, start + MAX_RESPONSE_BYTES)
+            file_content = mm[start:end].decode(errors="replace")
+
+        return CLIResult(
+            output=self._make_output(file_content, str(path), init_line=init_line)
+        )
+
+    def _iter_expanded(
+        self, path: Path, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Yield a byte range of a file as line-aligned chunks with tabs expanded."""
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = (end if end is not None else path.stat().st_size) - start
+            carry = b""
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data = carry + chunk
+                cut = data.rfind(b"\n") + 1 if remaining > 0 else len(data)
+                carry = data[cut:]
+                if cut:
+                    yield _expand_tabs(data[:cut])
+            if carry:
+                yield _expand_tabs(carry)
+
+    def _rewrite(self, path: Path, write) -> None:
+        """Write a new version of a file through a temp file, then swap it in."""
+        fd, tmp_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as out:
+                write(out)
+            shutil.copymode(path, tmp_path)
+            os.replace(tmp_path, path)
+        except ToolError:
+            os.unlink(tmp_path)
+            raise
+        except Exception as e:
+            os.unlink(tmp_path)
+            raise ToolError(f"Ran into {e} while trying to write to {path}") from None
+
+    def _kept_for_undo(self, path: Path) -> Tuple[bool, Optional[bytes]]:
+        """
+        Check whether streaming a large file through an edit expands its tabs.
+
+        If it does, the whole file is returned so the edit can be undone to it.
+        A file too large for the undo history is not returned; its edits then
+        cannot be undone past this one, so callers forget them.
+        """
+        # Plain reads, as scanning a mapping would count the whole file as RSS
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                if b"\t" in chunk:
+                    break
+            else:
+                return False, None
+        if path.stat().st_size > MAX_HISTORY_BYTES:
+            return True, None
+        return True, path.read_bytes()
+
+    def _snippet_at(self, path: Path, anchor: int, before: int, count: int) -> str:
+        if not path.stat().st_size:
+            return ""
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            start, end = _lines_near(mm, anchor, before, count)
+            return mm[start:end].decode(errors="replace")
+
+    def _str_replace_large(self, path: Path, old_str: str, new_str: str | None):
+        """Replace a unique old_str by streaming the file through a temp file."""
+        old_str = old_str.expandtabs()
+        new_str = new_str.expandtabs() if new_str is not None else ""
+        old, new = old_str.encode(), new_str.encode()
+        # (line, byte offset in the new file) of the replacement
+        found: list = []
+        expands, before = self._kept_for_undo(path)
+
+        def write(out) -> None:
+            lines_out = bytes_out = 0
+
+            def emit(data: bytes) -> None:
+                nonlocal lines_out, bytes_out
+                out.write(data)
+                lines_out += data.count(b"\n")
+                bytes_out += len(data)
+
+            # UTF-8 is self-synchronizing, so a byte match is a character match
+            pending = b""
+            for chunk in self._iter_expanded(path):
+                data = pending + chunk
+                start = 0
+                while (index := data.find(old, start)) != -1:
+                    if found:
+                        raise ToolError(self._multiple_occurrences(path, old_str))
+                    emit(data[start:index])
+                    found.append((lines_out, bytes_out))
+                    emit(new)
+                    start = index + len(old)
+                # The last len(old) - 1 bytes may start a match in the next chunk
+                keep = max(start, len(data) - len(old) + 1)
+                emit(data[start:keep])
+                pending = data[keep:]
+            emit(pending)
+            if not found:
+                raise ToolError(
+                    f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
+                )
+
+        self._rewrite(path, write)
+        replacement_line, offset = found[0]
+        if expands and before is None:
+            self._file_history.forget(path)
+        else:
+            self._record_edit(path, offset, len(new), old, before)
+
+        start_line = max(0, replacement_line - SNIPPET_LINES)
+        end_line = replacement_line + SNIPPET_LINES + new_str.count("\n")
+        snippet = self._snippet_at(
+            path, offset, replacement_line - start_line, end_line - start_line + 1
+        )
+
+        success_msg = f"The file {path} has been edited. "
+        success_msg += self._make_output(
+            snippet, f"a snippet of {path}", start_line + 1
+        )
+        success_msg += "Review the changes and make sure they are as expected. Edit the file again if necessary."
+        return CLIResult(output=success_msg)
+
+    def _multiple_occurrences(self, path: Path, old_str: str) -> str:
+        with open(path) as f:
+            lines = [
+                idx + 1
+                for idx, line in enumerate(f)
+                if old_str in line.rstrip("\n").expandtabs()
+            ]
+        return f"No replacement was performed. Multiple occurrences of old_str `{old_str}` in lines {lines}. Please ensure it is unique"
+
+    def _insert_large(self, path: Path, insert_line: int, new_str: str):
+        """Insert new_str after a line by streaming the file through a temp file."""
+        new_str = new_str.expandtabs()
+        index = self._line_index(path)
+        n_lines_file = index.n_lines
+        if insert_line < 0 or insert_line > n_lines_file:
+            raise ToolError(
+                f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, n_lines_file]}"
+            )
+
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            split = (
+                index.line_start(mm, insert_line)
+                if insert_line < n_lines_file
+                else len(mm)
+            )
+        # Before the last line the text goes in front of the next line, else it is appended
+        inserted = (
+            new_str + "\n" if insert_line < n_lines_file else "\n" + new_str
+        ).encode()
+        offset: list = []
+        expands, before = self._kept_for_undo(path)
+
+        def write(out) -> None:
+            written = 0
+            for chunk in self._iter_expanded(path, 0, split):
+                out.write(chunk)
+                written += len(chunk)
+            offset.append(written)
+            out.write(inserted)
+            for chunk in self._iter_expanded(path, split):
+                out.write(chunk)
+
+        self._rewrite(path, write)
+        if expands and before is None:
+            self._file_history.forget(path)
+        else:
+            self._record_edit(path, offset[0], len(inserted), b"", before)
+
+        start_line = max(0, insert_line - SNIPPET_LINES)
+        anchor = offset[0] + (0 if insert_line < n_lines_file else 1)
+        snippet = self._snippet_at(
+            path,
+            anchor,
+            insert_line - start_line,
+            insert_line - start_line + new_str.count("\n") + 1 + SNIPPET_LINES,
+        )
+
+        success_msg = f"The file {path} has been edited. "
+        success_msg += self._make_output(
+            snippet,
+            "a snippet of the edited file",
+            max(1, insert_line - SNIPPET_LINES + 1),
+        )
+        success_msg += "Review the changes and make sure they are as expected (correct indentation, no duplicate lines, etc). Edit the file again if necessary."
+        return CLIResult(output=success_msg)
+
+    def _record_edit(
+        self,
+        path: Path,
+        offset: int,
+        length: int,
+        old: bytes,
+        before: Optional[bytes] = None,
+    ) -> None:
+        """
+        Remember how to undo an edit that put `length` bytes at `offset` over `old`.
+
+        `before` is the whole file before the edit, given when rewriting it also
+        expanded tabs or normalized newlines elsewhere; undo then restores it.
+        """
+        size = path.stat().st_size
+        if before is not None:
+            offset, length, old = 0, size, before
+        self._file_history.push(path, _Splice(offset, length, old, size))
+
+    def _apply_splice(self, path: Path, splice: _Splice) -> None:
+        """Restore the bytes an edit replaced."""
+        if path.stat().st_size != splice.size:
+            raise ToolError(
+                f"{path} was changed outside of this tool after the last edit, so the edit cannot be undone."
+            )
+        if not self._is_large(path):
+            try:
+                data = path.read_bytes()
+                path.write_bytes(
+                    data[: splice.offset]
+                    + splice.old
+                    + data[splice.offset + splice.length :]
+                )
+            except Exception as e:
+                raise ToolError(
+                    f"Ran into {e} while trying to write to {path}"
+                ) from None
+            return
+
+        def write(out) -> None:
+            with open(path, "rb") as f:
+                remaining = splice.offset
+                while remaining > 0 and (chunk := f.read(min(CHUNK_SIZE, remaining))):
+                    out.write(chunk)
+                    remaining -= len(chunk)
+                out.write(splice.old)
+                f.seek(splice.offset + splice.length)
+                shutil.copyfileobj(f, out, CHUNK_SIZE)
+
+        self._rewrite(path, write)
+
     def read_file(self, path: Path):
         """Read the content of a file from a given path; raise a ToolError if an error occurs."""
         try:
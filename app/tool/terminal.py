@@ -1,9 +1,63 @@
 import asyncio
 import os
 import shlex
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
+
+from pydantic import Field
 
 from app.tool.base import BaseTool, CLIResult
+from app.tool.bash import _BashSession
+
+
+# Activation environments of conda envs: name -> (prefix, prefix stamp, environ)
+_conda_envs: Dict[str, Tuple[str, Optional[int], Dict[str, str]]] = {}
+
+
+def _prefix_stamp(prefix: str) -> Optional[int]:
+    """Modification time of an env's package metadata, which changes on (un)install."""
+    try:
+        return os.stat(os.path.join(prefix, "conda-meta")).st_mtime_ns
+    except OSError:
+        return None
+
+
+async def get_conda_environ(env_name: str) -> Dict[str, str]:
+    """
+    Return the environment variables of an activated conda env.
+
+    They are captured once with `conda run` and reused until the env's prefix
+    changes (packages installed or removed, or the env recreated).
+    """
+    cached = _conda_envs.get(env_name)
+    if cached:
+        prefix, stamp, environ = cached
+        if stamp is not None and _prefix_stamp(prefix) == stamp:
+            return environ
+
+    process = await asyncio.create_subprocess_exec(
+        "conda",
+        "run",
+        "-n",
+        env_name,
+        "env",
+        "-0",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(
+            f"Failed to activate conda env '{env_name}': {stderr.decode().strip()}"
+        )
+
+    environ = dict(
+        item.split("=", 1)
+        for item in stdout.decode().split("\0")
+        if "=" in item
+    )
+    prefix = environ.get("CONDA_PREFIX", "")
+    _conda_envs[env_name] = (prefix, _prefix_stamp(prefix), environ)
+    return environ
 
 
 class Terminal(BaseTool):
@@ -13,7 +67,7 @@ Use this when you need to perform system operations or run specific commands to
 You must tailor your command to the user's system and provide a clear explanation of what the command does.
 Prefer to execute complex CLI commands over creating executable scripts, as they are more flexible and easier to run.
 Commands will be executed in the current working directory.
-Note: You MUST append a `sleep 0.05` to the end of the command for commands that will complete in under 50ms, as this will circumvent a known issue with the terminal tool where it will sometimes not return the output when the command completes too quickly.
+Commands are stopped after `timeout` seconds (120 by default). Pass a larger `timeout` for long builds or installs, or run the command in the background with its output redirected to a file.
 """
     parameters: dict = {
         "type": "object",
@@ -21,20 +75,32 @@ Note: You MUST append a `sleep 0.05` to the end of the command for commands that
             "command": {
                 "type": "string",
                 "description": "(required) The CLI command to execute. This should be valid for the current operating system. Ensure the command is properly formatted and does not contain any harmful instructions.",
-            }
+            },
+            "timeout": {
+                "type": "integer",
+                "description": "(optional) Seconds to wait for the command before it is stopped. Default is 120.",
+            },
         },
         "required": ["command"],
     }
-    process: Optional[asyncio.subprocess.Process] = None
+    exclusive: bool = True
     current_path: str = os.getcwd()
-    lock: asyncio.Lock = asyncio.Lock()
+    # Each terminal runs its commands one at a time, independently of other terminals
+    lock: asyncio.Lock = Field(default_factory=asyncio.Lock)
+    # One persistent shell per working directory (and conda env), reused across commands
+    shells: Dict[Tuple[str, Optional[str]], _BashSession] = Field(default_factory=dict)
+    # Seconds a command may run when the call does not give a timeout
+    timeout: float = 120.0
+    # Called with output as it arrives, e.g. to show the progress of long commands
+    on_output: Optional[Callable[[str], None]] = None
 
-    async def execute(self, command: str) -> CLIResult:
+    async def execute(self, command: str, timeout: Optional[float] = None) -> CLIResult:
         """
         Execute a terminal command asynchronously with persistent context.
 
         Args:
             command (str): The terminal command to execute.
+            timeout (float, optional): Seconds each command may run; defaults to `self.timeout`.
 
         Returns:
             str: The output, and error of the command execution.
@@ -51,22 +117,9 @@ Note: You MUST append a `sleep 0.05` to the end of the command for commands that
                 result = await self._handle_cd_command(sanitized_command)
             else:
                 async with self.lock:
-                    try:
-                        self.process = await asyncio.create_subprocess_shell(
-                            sanitized_command,
-                            stdout=asyncio.subprocess.PIPE,
-                            stderr=asyncio.subprocess.PIPE,
-                            cwd=self.current_path,
-                        )
-                        stdout, stderr = await self.process.communicate()
-                        result = CLIResult(
-                            output=stdout.decode().strip(),
-                            error=stderr.decode().strip(),
-                        )
-                    except Exception as e:
-                        result = CLIResult(output="", error=str(e))
-                    finally:
-                        self.process = None
+                    result = await self._run_in_shell(
+                        sanitized_command, timeout=timeout
+                    )
 
             # Combine outputs
             if result.output:
@@ -83,24 +136,78 @@ Note: You MUST append a `sleep 0.05` to the end of the command for commands that
         final_output.error = final_output.error.rstrip()
         return final_output
 
-    async def execute_in_env(self, env_name: str, command: str) -> CLIResult:
+    async def execute_in_env(
+        self, env_name: str, command: str, timeout: Optional[float] = None
+    ) -> CLIResult:
         """
         Execute a terminal command asynchronously within a specified Conda environment.
 
         Args:
             env_name (str): The name of the Conda environment.
             command (str): The terminal command to execute within the environment.
+            timeout (float, optional): Seconds the command may run; defaults to `self.timeout`.
 
         Returns:
             str: The output, and error of the command execution.
         """
         sanitized_command = self._sanitize_command(command)
 
-        # Construct the command to run within the Conda environment
-        # Using 'conda run -n env_name command' to execute without activating
-        conda_command = f"conda run -n {shlex.quote(env_name)} {sanitized_command}"
+        # Reuse the captured activation instead of paying `conda run` per command
+        try:
+            environ = await get_conda_environ(env_name)
+        except Exception as e:
+            return CLIResult(output="", error=str(e))
+
+        async with self.lock:
+            return await self._run_in_shell(
+                sanitized_command, env_name=env_name, environ=environ, timeout=timeout
+            )
 
-        return await self.execute(conda_command)
+    async def _run_in_shell(
+        self,
+        command: str,
+        env_name: Optional[str] = None,
+        environ: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> CLIResult:
+        """Run a command in the persistent shell of the current directory."""
+        path = self.current_path
+        key = (path, env_name)
+        shell = self.shells.get(key)
+        try:
+            if (
+                shell is None
+                or shell._timed_out
+                or shell._process.returncode is not None
+                # the env was re-activated after its prefix changed
+                or (environ is not None and shell.env is not environ)
+            ):
+                if shell is not None:
+                    shell.stop()
+                shell = _BashSession(cwd=path, env=environ)
+                await shell.start()
+                self.shells[key] = shell
+
+            # Commands may change the shell's directory, so return to it first.
+            # The shell reads its commands from stdin, so the command gets
+            # /dev/null instead, or anything reading stdin would eat the next lines
+            result = await shell.run(
+                f"cd {shlex.quote(path)}\n{{\n{command}\n}} </dev/null",
+                self.on_output,
+                timeout or self.timeout,
+            )
+            if shell._process.returncode is not None:
+                # The command exited the shell; the next command gets a new one
+                self.shells.pop(key, None)
+            return CLIResult(
+                output=(result.output or "").strip(), error=(result.error or "").strip()
+            )
+        except Exception as e:
+            # A shell that failed or timed out is replaced on the next command
+            self.shells.pop(key, None)
+            if shell is not None and shell._started:
+                shell.stop()
+            return CLIResult(output="", error=str(e))
 
     async def _handle_cd_command(self, command: str) -> CLIResult:
         """
@@ -161,17 +268,16 @@ Note: You MUST append a `sleep 0.05` to the end of the command for commands that
         return command
 
     async def close(self):
-        """Close the persistent shell process if it exists."""
+        """Close the persistent shell processes if they exist."""
         async with self.lock:
-            if self.process:
-                self.process.terminate()
+            for shell in self.shells.values():
+                shell.stop()
                 try:
-                    await asyncio.wait_for(self.process.wait(), timeout=5)
+                    await asyncio.wait_for(shell._process.wait(), timeout=5)
                 except asyncio.TimeoutError:
-                    self.process.kill()
-                    await self.process.wait()
-                finally:
-                    self.process = None
+                    shell._process.kill()
+                    await shell._process.wait()
+            self.shells.clear()
 
     async def __aenter__(self):
         """Enter the asynchronous context manager."""
@@ -1,6 +1,7 @@
 """Collection classes for managing multiple tools."""
 
-from typing import Any, Dict, List
+import json
+from typing import Any, Callable, Dict, List, Optional
 
 from app.exceptions import ToolError
 from app.tool.base import BaseTool, ToolFailure, ToolResult
@@ -12,12 +13,44 @@ class ToolCollection:
     def __init__(self, *tools: BaseTool):
         self.tools = tools
         self.tool_map = {tool.name: tool for tool in tools}
+        # Serialized params and their token costs, rebuilt only on add/delete
+        self._params: Optional[List[Dict[str, Any]]] = None
+        self._param_tokens: Dict[str, int] = {}
 
     def __iter__(self):
         return iter(self.tools)
 
     def to_params(self) -> List[Dict[str, Any]]:
-        return [tool.to_param() for tool in self.tools]
+        if self._params is None:
+            self._params = [tool.to_param() for tool in self.tools]
+        return list(self._params)
+
+    def count_param_tokens(self, count_tokens: Callable[[str], int]) -> int:
+        """
+        Calculate the token cost of the tool schemas sent with each request.
+
+        Each tool is measured on its JSON wire form once and the count is kept
+        until the tool is added or deleted again.
+
+        Args:
+            count_tokens: Function returning the token count of a string, e.g. LLM.count_tokens.
+
+        Returns:
+            int: Total tokens across all tool params.
+        """
+        total = 0
+        for param in self.to_params():
+            name = param["function"]["name"]
+            if name not in self._param_tokens:
+                self._param_tokens[name] = count_tokens(
+                    json.dumps(param, ensure_ascii=False)
+                )
+            total += self._param_tokens[name]
+        return total
+
+    def _invalidate_params(self, name: str) -> None:
+        self._params = None
+        self._param_tokens.pop(name, None)
 
     async def execute(
         self, *, name: str, tool_input: Dict[str, Any] = None
@@ -48,6 +81,7 @@ class ToolCollection:
     def add_tool(self, tool: BaseTool):
         self.tools += (tool,)
         self.tool_map[tool.name] = tool
+        self._invalidate_params(tool.name)
         return self
 
     def add_tools(self, *tools: BaseTool):
@@ -62,4 +96,5 @@ class ToolCollection:
             del self.tool_map[name]
             # Remove from tools tuple
             self.tools = tuple(tool for tool in self.tools if tool.name != name)
+            self._invalidate_params(name)
         return self
@@ -0,0 +1,325 @@
+"""Concurrent fetching of web pages as plain text."""
+
+import asyncio
+import hashlib
+import html
+import re
+import weakref
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urldefrag, urlsplit
+
+import html2text
+import httpx
+
+from app.config import WebFetchSettings, config
+from app.tool.content_cache import CachedPage, get_content_cache
+from app.tool.base import BaseTool, ToolResult
+from app.tool.web_search import WebSearch
+
+
+_WEB_FETCH_DESCRIPTION = """Fetch web pages and return their readable text, several pages at once.
+* Give `urls` to read specific pages, or a `query` to search the web and read the top `num_results` results in one step
+* Pages are fetched concurrently over plain HTTP without rendering JavaScript; use BrowserUseTool for pages that need interaction or scripts
+* Text that repeats across pages (navigation, cookie banners, footers) is returned only once and each page is cut to a short excerpt
+"""
+
+_TEXT_TYPES = ("text/plain", "application/json", "application/xml", "text/xml")
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+class FetchedPage(NamedTuple):
+    url: str
+    final_url: str = ""
+    status: int = 0
+    title: str = ""
+    text: str = ""
+    error: Optional[str] = None
+    # Whether the body was cut off at max_page_bytes
+    truncated: bool = False
+
+
+def _decode(body: bytes, charset: Optional[str]) -> str:
+    """Decode a page with its declared charset, falling back to UTF-8."""
+    if not charset:
+        match = _META_CHARSET_RE.search(body[:4096])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def html_to_text(body: str) -> Tuple[str, str]:
+    """Return the title and the markdown-like text of an HTML document."""
+    match = _TITLE_RE.search(body, 0, 65536)
+    title = " ".join(html.unescape(match.group(1)).split()) if match else ""
+
+    converter = html2text.HTML2Text()
+    converter.ignore_links = True
+    converter.ignore_images = True
+    converter.ignore_emphasis = True
+    converter.body_width = 0
+    return title, converter.handle(body)
+
+
+def _paragraphs(text: str) -> List[str]:
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", text):
+        lines = [" ".join(line.split()) for line in block.splitlines()]
+        block = "\n".join(line for line in lines if line)
+        if block:
+            paragraphs.append(block)
+    return paragraphs
+
+
+def build_excerpts(
+    pages: List[FetchedPage], max_chars: int
+) -> List[Tuple[FetchedPage, str]]:
+    """
+    Cut the text of each fetched page down to an excerpt.
+
+    Paragraphs already seen on an earlier page (or earlier on the same page)
+    are dropped, which removes shared boilerplate, and pages whose final URL
+    was already covered are skipped.
+    """
+    seen_paragraphs = set()
+    seen_urls = set()
+    excerpts = []
+    for page in pages:
+        if page.error:
+            continue
+        url = urldefrag(page.final_url or page.url)[0]
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+
+        parts, size = [], 0
+        for paragraph in _paragraphs(page.text):
+            digest = hashlib.sha1(paragraph.casefold().encode()).digest()
+            if digest in seen_paragraphs:
+                continue
+            seen_paragraphs.add(digest)
+            if size + len(paragraph) > max_chars:
+                if not parts:
+                    parts.append(paragraph[:max_chars] + " ...")
+                else:
+                    parts.append("...")
+                break
+            parts.append(paragraph)
+            size += len(paragraph) + 2
+        excerpts.append((page, "\n\n".join(parts)))
+    return excerpts
+
+
+class PageFetcher:
+    """
+    Fetches pages over a pooled HTTP client.
+
+    Connections are shared by all fetches up to `max_connections`, while each
+    host gets at most `per_host_connections` requests at a time so that many
+    links to one site do not hammer it. Bodies are read up to `max_page_bytes`
+    and HTML is converted to text with html2text. Pages go through the shared
+    content cache, and stale copies are revalidated with a conditional GET.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[WebFetchSettings] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.settings = settings or WebFetchSettings()
+        self._client = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(max_connections=self.settings.max_connections),
+            timeout=httpx.Timeout(self.settings.timeout),
+            headers={"User-Agent": self.settings.user_agent},
+            follow_redirects=True,
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(
+                self.settings.per_host_connections
+            )
+        return self._host_limits[host]
+
+    async def fetch(self, url: str) -> FetchedPage:
+        """Fetch one page; failures are reported in the page's `error`."""
+        try:
+            if urlsplit(url).scheme not in ("http", "https"):
+                return FetchedPage(url, error="Only http and https URLs can be fetched")
+            async with self._host_limit(url):
+                return await asyncio.wait_for(self._fetch(url), self.settings.timeout)
+        except asyncio.TimeoutError:
+            return FetchedPage(
+                url, error=f"Timed out after {self.settings.timeout} seconds"
+            )
+        except httpx.HTTPError as e:
+            return FetchedPage(url, error=str(e) or type(e).__name__)
+        except Exception as e:
+            # Invalid URLs, undecodable bodies and converter errors fail this
+            # page only, not the batch it was fetched in
+            return FetchedPage(url, error=f"{type(e).__name__}: {e}")
+
+    async def _fetch(self, url: str) -> FetchedPage:
+        cache = get_content_cache()
+        cached, fresh = cache.lookup(url)
+        if cached and fresh:
+            return await self._from_cache(url, cached)
+
+        headers = cache.validators(cached) if cached else {}
+        async with self._client.stream("GET", url, headers=headers) as response:
+            final_url = str(response.url)
+            if response.status_code == 304 and cached:
+                return await self._from_cache(url, cache.revalidated(url) or cached)
+            if response.status_code >= 400:
+                return FetchedPage(
+                    url,
+                    final_url,
+                    response.status_code,
+                    error=f"HTTP {response.status_code}",
+                )
+            content_type = response.headers.get("content-type", "").lower()
+            is_html = "html" in content_type or not content_type
+            if not is_html and not content_type.startswith(_TEXT_TYPES):
+                return FetchedPage(
+                    url,
+                    final_url,
+                    response.status_code,
+                    error=f"Unsupported content type {content_type.split(';')[0]}",
+                )
+
+            chunks, size, truncated = [], 0, False
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.settings.max_page_bytes:
+                    truncated = True
+                    break
+            body = b"".join(chunks)[: self.settings.max_page_bytes]
+            charset = response.charset_encoding
+
+        raw = _decode(body, charset)
+        title, text = "", raw
+        if is_html:
+            # html2text is pure Python, so large pages are converted off the loop
+            title, text = await asyncio.to_thread(html_to_text, raw)
+        if response.status_code == 200 and not truncated:
+            # Pages fetched with cookies or credentials, or starting a cookie
+            # session, may be personalized, so they stay out of the shared cache
+            credentialed = "set-cookie" in response.headers or any(
+                "cookie" in r.request.headers or "authorization" in r.request.headers
+                for r in (*response.history, response)
+            )
+            cache.put(
+                url,
+                raw,
+                response.headers,
+                title,
+                text,
+                final_url=final_url,
+                credentialed=credentialed,
+            )
+        return FetchedPage(
+            url, final_url, response.status_code, title, text, truncated=truncated
+        )
+
+    async def _from_cache(self, url: str, cached: CachedPage) -> FetchedPage:
+        title, text = cached.title, cached.markdown
+        if text is None:
+            # Pages stored by the browser only carry their HTML
+            title, text = await asyncio.to_thread(html_to_text, cached.html)
+            title = cached.title or title
+            get_content_cache().update(url, cached.digest, markdown=text)
+        return FetchedPage(url, cached.final_url or cached.url, 200, title, text)
+
+    async def fetch_all(self, urls: List[str]) -> List[FetchedPage]:
+        """Fetch pages concurrently, in the order of `urls`."""
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# One fetcher per event loop, since the client and semaphores are bound to it
+_fetchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PageFetcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_page_fetcher() -> PageFetcher:
+    """Return the page fetcher of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    if loop not in _fetchers:
+        _fetchers[loop] = PageFetcher(config.web_fetch_config)
+    return _fetchers[loop]
+
+
+def _result_url(result: Any) -> Optional[str]:
+    if isinstance(result, dict):
+        return result.get("url")
+    if isinstance(result, str):
+        return result
+    return None
+
+
+class WebFetch(BaseTool):
+    """A tool for reading several web pages, or the results of a search, at once"""
+
+    name: str = "web_fetch"
+    description: str = _WEB_FETCH_DESCRIPTION
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "urls": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "(optional) URLs of the pages to read.",
+            },
+            "query": {
+                "type": "string",
+                "description": "(optional) Search the web for this query and read the top results. Used when `urls` is not given.",
+            },
+            "num_results": {
+                "type": "integer",
+                "description": "(optional) Number of search results to read for `query`. Default is 5.",
+                "default": 5,
+            },
+        },
+    }
+
+    async def execute(
+        self,
+        urls: Optional[List[str]] = None,
+        query: Optional[str] = None,
+        num_results: int = 5,
+    ) -> ToolResult:
+        if not urls:
+            if not query:
+                return ToolResult(error="Either `urls` or `query` is required")
+            results = await WebSearch().execute(query, num_results)
+            urls = [url for result in results if (url := _result_url(result))]
+            urls = urls[: max(1, num_results)]
+            if not urls:
+                return ToolResult(error=f"No search results found for '{query}'")
+
+        # Drop repeated URLs before fetching anything
+        urls = list(dict.fromkeys(urldefrag(url.strip())[0] for url in urls))
+        fetcher = get_page_fetcher()
+        pages = await fetcher.fetch_all(urls)
+
+        blocks = []
+        for i, (page, excerpt) in enumerate(
+            build_excerpts(pages, fetcher.settings.max_excerpt_chars), 1
+        ):
+            header = f"[{i}] {page.title or page.final_url}\nURL: {page.final_url}"
+            blocks.append(f"{header}\n{excerpt or '(no text beyond the pages above)'}")
+        failures = [f"- {page.url}: {page.error}" for page in pages if page.error]
+        if failures:
+            blocks.append("Could not fetch:\n" + "\n".join(failures))
+        if not blocks:
+            return ToolResult(error="No pages could be fetched")
+        return ToolResult(output="\n\n".join(blocks))
@@ -1,9 +1,12 @@
 import asyncio
-from typing import List
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
 
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from app.config import config
+from app.config import SearchSettings, config
+from app.logger import logger
 from app.tool.base import BaseTool
 from app.tool.search import (
     BaiduSearchEngine,
@@ -11,6 +14,65 @@ from app.tool.search import (
 )
 
 
+class SearchResultCache:
+    """
+    LRU of search results with a time-to-live.
+
+    Entries are keyed on the case- and whitespace-normalized query together
+    with the number of results asked for. Only non-empty results are stored.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: int = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[Any]]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, num_results: int) -> Tuple[str, int]:
+        return " ".join(query.casefold().split()), num_results
+
+    def get(self, key: Tuple[str, int]) -> Optional[List[Any]]:
+        """Return the cached results for key, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            created, results = entry
+            if time.monotonic() - created <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(results)
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Tuple[str, int], results: List[Any]) -> None:
+        if not self.ttl or not results:
+            return
+        self._entries[key] = (time.monotonic(), list(results))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _search_settings() -> SearchSettings:
+    return config.search_config or SearchSettings()
+
+
+_cache: Optional[SearchResultCache] = None
+
+
+def get_search_cache() -> SearchResultCache:
+    """Return the result cache shared by all WebSearch instances."""
+    global _cache
+    if _cache is None:
+        settings = _search_settings()
+        _cache = SearchResultCache(settings.cache_size, settings.cache_ttl)
+    return _cache
+
+
 class WebSearch(BaseTool):
     name: str = "web_search"
     description: str = """Perform a web search and return a list of relevant links.
@@ -32,15 +94,16 @@ class WebSearch(BaseTool):
         "required": ["query"],
     }
     _search_engine: dict[str, WebSearchEngine] = {
-
-        "baidu": BaiduSearchEngine()
-
+        "baidu": BaiduSearchEngine(),
     }
 
     async def execute(self, query: str, num_results: int = 10) -> List[str]:
         """
         Execute a Web search and return a list of URLs.
 
+        Engines are tried in order, each within its own deadline, and results
+        are reused for repeated queries until the cache TTL expires.
+
         Args:
             query (str): The search query to submit to the search engine.
             num_results (int, optional): The number of search results to return. Default is 10.
@@ -48,17 +111,29 @@ class WebSearch(BaseTool):
         Returns:
             List[str]: A list of URLs matching the search query.
         """
+        cache = get_search_cache()
+        key = cache.make_key(query, num_results)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
         engine_order = self._get_engine_order()
         for engine_name in engine_order:
             engine = self._search_engine[engine_name]
             try:
-                links = await self._perform_search_with_engine(
-                    engine, query, num_results
+                links = await self._search_before_deadline(engine, query, num_results)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"Search engine '{engine_name}' did not answer within "
+                    f"{_search_settings().timeout} seconds"
                 )
-                if links:
-                    return links
+                continue
             except Exception as e:
-                print(f"Search engine '{engine_name}' failed with error: {e}")
+                logger.warning(f"Search engine '{engine_name}' failed with error: {e}")
+                continue
+            if links:
+                cache.set(key, links)
+                return links
         return []
 
     def _get_engine_order(self) -> List[str]:
@@ -81,6 +156,17 @@ class WebSearch(BaseTool):
                 engine_order.append(key)
         return engine_order
 
+    async def _search_before_deadline(
+        self,
+        engine: WebSearchEngine,
+        query: str,
+        num_results: int,
+    ) -> List[str]:
+        return await asyncio.wait_for(
+            self._perform_search_with_engine(engine, query, num_results),
+            _search_settings().timeout,
+        )
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
@@ -91,7 +177,13 @@ class WebSearch(BaseTool):
         query: str,
         num_results: int,
     ) -> List[str]:
+        # The deadline is also the engine's request timeout, for clients that
+        # support one; the executor thread cannot be stopped otherwise
+        timeout = _search_settings().timeout
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
-            None, lambda: list(engine.perform_search(query, num_results=num_results))
+            None,
+            lambda: list(
+                engine.perform_search(query, num_results=num_results, timeout=timeout)
+            ),
         )
@@ -0,0 +1,252 @@
+"""In-process, cached view of the files of a workspace."""
+
+import os
+import re
+from collections import OrderedDict
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+
+class WalkEntry(NamedTuple):
+    """A file or directory found by `WorkspaceIndex.walk`."""
+
+    path: str
+    is_dir: bool
+    depth: int
+    # Set on a placeholder standing for entries of the directory `path` that
+    # were left out because of the per-directory cap
+    omitted: int = 0
+
+
+class _IgnoreRule(NamedTuple):
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression body."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+def _parse_gitignore(text: str) -> List[_IgnoreRule]:
+    """Parse the rules of a .gitignore file."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A pattern with a slash is relative to the .gitignore's directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "^" if anchored else "^(?:.*/)?"
+        rules.append(
+            _IgnoreRule(
+                re.compile(prefix + _translate_glob(line) + "$"), negate, dir_only
+            )
+        )
+    return rules
+
+
+# Rules in effect while walking: (directory of the .gitignore, its rules)
+_IgnoreStack = Tuple[Tuple[str, List[_IgnoreRule]], ...]
+
+
+def _is_ignored(stack: _IgnoreStack, path: str, is_dir: bool) -> bool:
+    ignored = False
+    for base, rules in stack:
+        relative = os.path.relpath(path, base).replace(os.sep, "/")
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(relative):
+                ignored = not rule.negate
+    return ignored
+
+
+class WorkspaceIndex:
+    """
+    Cached directory listings for tools that browse the workspace.
+
+    Listings come from `os.scandir` and are reused until the directory's mtime
+    changes, which happens whenever an entry is added, removed or renamed.
+    Walks skip hidden entries and honor the .gitignore files of the walked
+    tree and of its parents up to the enclosing git repository.
+    """
+
+    def __init__(self, max_cached_dirs: int = 4096):
+        self.max_cached_dirs = max_cached_dirs
+        self._listings: "OrderedDict[str, Tuple[int, List[Tuple[str, bool]]]]" = (
+            OrderedDict()
+        )
+        self._gitignores: dict = {}
+
+    def scan(self, directory: str) -> List[Tuple[str, bool]]:
+        """Return the sorted (name, is_dir) entries of a directory."""
+        mtime = os.stat(directory).st_mtime_ns
+        cached = self._listings.get(directory)
+        if cached and cached[0] == mtime:
+            self._listings.move_to_end(directory)
+            return cached[1]
+
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+        entries.sort()
+
+        self._listings[directory] = (mtime, entries)
+        if len(self._listings) > self.max_cached_dirs:
+            self._listings.popitem(last=False)
+        return entries
+
+    def _gitignore_rules(self, directory: str) -> List[_IgnoreRule]:
+        path = os.path.join(directory, ".gitignore")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._gitignores.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                rules = _parse_gitignore(f.read())
+        except OSError:
+            rules = []
+        self._gitignores[path] = (mtime, rules)
+        return rules
+
+    def _parent_rules(self, root: str) -> _IgnoreStack:
+        """Rules of the .gitignore files above `root` within its git repository."""
+        if os.path.exists(os.path.join(root, ".git")):
+            return ()
+        parents = []
+        directory = os.path.dirname(root)
+        while directory and directory != os.path.dirname(directory):
+            parents.append(directory)
+            if os.path.exists(os.path.join(directory, ".git")):
+                break
+            directory = os.path.dirname(directory)
+        else:
+            # Not inside a repository, so no parent .gitignore applies
+            return ()
+        return tuple(
+            (d, rules) for d in reversed(parents) if (rules := self._gitignore_rules(d))
+        )
+
+    def walk(
+        self,
+        root: str,
+        max_depth: Optional[int] = None,
+        max_entries_per_dir: Optional[int] = None,
+        respect_gitignore: bool = True,
+    ) -> Iterator[WalkEntry]:
+        """
+        Walk a directory tree depth first, in name order.
+
+        Args:
+            root: Directory to walk; it is not yielded itself.
+            max_depth: Deepest level to yield, 1 being the entries of `root`.
+            max_entries_per_dir: Entries yielded per directory before the rest
+                are summarized by a placeholder entry.
+            respect_gitignore: Skip entries ignored by .gitignore files.
+        """
+        root = os.path.abspath(root)
+        stack = self._parent_rules(root) if respect_gitignore else ()
+        yield from self._walk(
+            root, 1, max_depth, max_entries_per_dir, stack, respect_gitignore
+        )
+
+    def _walk(
+        self,
+        directory: str,
+        depth: int,
+        max_depth: Optional[int],
+        max_entries: Optional[int],
+        stack: _IgnoreStack,
+        respect_gitignore: bool,
+    ) -> Iterator[WalkEntry]:
+        try:
+            entries = self.scan(directory)
+        except OSError:
+            return
+        if respect_gitignore and (rules := self._gitignore_rules(directory)):
+            stack = stack + ((directory, rules),)
+
+        shown = omitted = 0
+        for name, is_dir in entries:
+            if name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            if respect_gitignore and _is_ignored(stack, path, is_dir):
+                continue
+            if max_entries is not None and shown >= max_entries:
+                omitted += 1
+                continue
+            shown += 1
+            yield WalkEntry(path, is_dir, depth)
+            if is_dir and (max_depth is None or depth < max_depth):
+                yield from self._walk(
+                    path, depth + 1, max_depth, max_entries, stack, respect_gitignore
+                )
+        if omitted:
+            yield WalkEntry(directory, True, depth, omitted=omitted)
+
+    def iter_files(self, root: str) -> Iterator[str]:
+        """Yield the paths of all files under `root` that are not ignored."""
+        for entry in self.walk(root):
+            if not entry.is_dir:
+                yield entry.path
+
+
+_workspace_index: Optional[WorkspaceIndex] = None
+
+
+def get_workspace_index() -> WorkspaceIndex:
+    """Return the workspace index shared by all tools."""
+    global _workspace_index
+    if _workspace_index is None:
+        _workspace_index = WorkspaceIndex()
+    return _workspace_index
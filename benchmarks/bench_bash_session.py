@@ -0,0 +1,62 @@
+"""
+Benchmark the command overhead and output capture of the bash tool's session.
+
+Usage:
+    python benchmarks/bench_bash_session.py [--runs 50] [--lines 2000000]
+
+Reports the mean and worst time of a no-op command (`true`), which is the
+latency the session itself adds, and the time and captured size of a command
+printing `--lines` lines, whose output is cut down to a head and a tail.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tool.bash import _BashSession  # noqa: E402
+
+
+async def main(runs: int, lines: int) -> None:
+    session = _BashSession()
+    await session.start()
+    try:
+        # The first command pays for the shell's startup
+        await session.run("true")
+
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            await session.run("true")
+            timings.append(time.perf_counter() - started)
+        print(
+            f"'true' x {runs}: mean {statistics.mean(timings) * 1000:.2f} ms, "
+            f"max {max(timings) * 1000:.2f} ms"
+        )
+
+        started = time.perf_counter()
+        result = await session.run(f"seq 1 {lines}")
+        elapsed = time.perf_counter() - started
+        produced = sum(len(str(i)) + 1 for i in range(1, lines + 1))
+        print(
+            f"'seq 1 {lines}' ({produced / 1e6:.1f} MB): {elapsed * 1000:.0f} ms, "
+            f"{len(result.output)} characters captured"
+        )
+    finally:
+        session.stop()
+        # bash handles the signal once its read of stdin returns
+        session._process.stdin.close()
+        await session._process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.lines))
@@ -0,0 +1,109 @@
+"""
+Benchmark the code_search trigram index against `grep -rnI`.
+
+Usage:
+    python benchmarks/bench_code_search.py [--root PATH]
+
+Copies `--root` (the Python standard library by default) to a temporary
+directory and indexes the copy. Each query is then timed through the index,
+with the tool's default cap of 50 results, and through `grep -rnI`, and both
+must find the same `path:line` hits within the files the index covers (grep
+also searches hidden, ignored and large files). Also times an incremental
+`update_file` and a full `refresh`, and reports the process RSS after the
+build.
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+from typing import Set, Tuple
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tool.code_search import TrigramIndex  # noqa: E402
+
+
+# (query, regex, the same query for grep -E)
+QUERIES = [
+    ("def __init__", False, "def __init__"),
+    ("import threading", False, "import threading"),
+    ("raise ValueError", False, "raise ValueError"),
+    ("NotImplementedError", False, "NotImplementedError"),
+    (r"class \w+Error\(", True, r"class [[:alnum:]_]+Error\("),
+    (r"sys\.version_info >= \(3", True, r"sys\.version_info >= \(3"),
+    ("xyzzy_not_there", False, "xyzzy_not_there"),
+]
+
+
+def grep_hits(root: str, pattern: str) -> Tuple[float, Set[Tuple[str, int]]]:
+    started = time.perf_counter()
+    output = subprocess.run(
+        ["grep", "-rnIE", "--", pattern, root],
+        capture_output=True,
+        text=True,
+        errors="replace",
+    ).stdout
+    elapsed = time.perf_counter() - started
+    hits = set()
+    for line in output.splitlines():
+        path, line_no, _ = line.split(":", 2)
+        hits.add((os.path.abspath(path), int(line_no)))
+    return elapsed, hits
+
+
+def main(source: str) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "tree")
+        # A copy, since the incremental update below touches one of its files
+        shutil.copytree(source, root, symlinks=True)
+        run(root)
+
+
+def run(root: str) -> None:
+    index = TrigramIndex(root)
+    started = time.perf_counter()
+    index.build()
+    indexed = {path for path, doc in index._docs.items() if doc[0] >= 0}
+    # ru_maxrss is in kilobytes on Linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"build: {time.perf_counter() - started:.1f} s for {len(indexed)} files "
+        f"under {root}, {rss:.0f} MB RSS"
+    )
+
+    for query, regex, grep_pattern in QUERIES:
+        started = time.perf_counter()
+        index.search(query, regex=regex)
+        capped = time.perf_counter() - started
+
+        matches = index.search(query, regex=regex, max_results=sys.maxsize)
+        ours = {(os.path.join(root, m.path), m.line) for m in matches}
+        grep_time, theirs = grep_hits(root, grep_pattern)
+        theirs = {hit for hit in theirs if hit[0] in indexed}
+        print(
+            f"{query!r}: index {capped * 1000:.1f} ms, grep {grep_time * 1000:.0f} ms, "
+            f"{len(ours)} hits, {'same as' if ours == theirs else 'DIFFERENT from'} grep"
+        )
+
+    path = next(iter(indexed))
+    os.utime(path)
+    started = time.perf_counter()
+    index.update_file(path)
+    print(f"update_file: {(time.perf_counter() - started) * 1000:.2f} ms")
+    started = time.perf_counter()
+    index.refresh()
+    print(f"refresh: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--root", default=sysconfig.get_paths()["stdlib"])
+    args = parser.parse_args()
+    main(args.root)
@@ -0,0 +1,113 @@
+"""
+Benchmark StrReplaceEditor on a large generated log file.
+
+Usage:
+    python benchmarks/bench_large_file_editor.py [--size-mb 1024] [--dir /tmp]
+
+Writes a log of about `--size-mb` MB, then times the first `view_range` (which
+builds the line index), a cached `view_range`, `str_replace`, `insert` and
+undoing both edits, and reports the peak RSS of the process. The file is
+removed afterwards.
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tool.str_replace_editor import StrReplaceEditor  # noqa: E402
+
+
+MARKER = "unique marker line for str_replace"
+
+
+def write_log(path: str, size: int) -> int:
+    """Write a log of about `size` bytes with MARKER in the middle; return its lines."""
+    lines = 0
+    written = 0
+    block = []
+    with open(path, "w") as f:
+        while written < size:
+            line = (
+                f"2024-01-01 00:00:{lines % 60:02d} INFO worker-{lines % 16} "
+                f"request id={lines} path=/api/items/{lines % 997} took {lines % 250}ms\n"
+            )
+            if lines and written < size // 2 <= written + len(line):
+                line = MARKER + "\n"
+            block.append(line)
+            written += len(line)
+            lines += 1
+            if len(block) >= 10000:
+                f.write("".join(block))
+                block = []
+        f.write("".join(block))
+    return lines
+
+
+def timed(label: str, coro) -> str:
+    started = time.perf_counter()
+    result = asyncio.run(coro)
+    print(f"{label}: {(time.perf_counter() - started) * 1000:.1f} ms")
+    return result
+
+
+def main(size_mb: int, directory: str) -> None:
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".log")
+    os.close(fd)
+    try:
+        started = time.perf_counter()
+        lines = write_log(path, size_mb * 1024 * 1024)
+        size = os.path.getsize(path)
+        print(
+            f"generated {size / 1e9:.2f} GB, {lines} lines "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+
+        editor = StrReplaceEditor()
+        middle = lines // 2
+        view_range = [middle, middle + 20]
+        timed(
+            "view_range (builds the line index)",
+            editor.execute(command="view", path=path, view_range=view_range),
+        )
+        timed(
+            "view_range (cached index)",
+            editor.execute(command="view", path=path, view_range=view_range),
+        )
+        timed(
+            "str_replace",
+            editor.execute(
+                command="str_replace",
+                path=path,
+                old_str=MARKER,
+                new_str=MARKER + " (edited)",
+            ),
+        )
+        timed(
+            "insert",
+            editor.execute(
+                command="insert", path=path, insert_line=middle, new_str="inserted"
+            ),
+        )
+        timed("undo insert", editor.execute(command="undo_edit", path=path))
+        timed("undo str_replace", editor.execute(command="undo_edit", path=path))
+
+        # ru_maxrss is in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"peak RSS: {peak:.0f} MB")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+    main(args.size_mb, args.dir)
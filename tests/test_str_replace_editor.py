@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app.exceptions import ToolError
+from app.tool.str_replace_editor import StrReplaceEditor
+
+
+def run(editor: StrReplaceEditor, **kwargs) -> str:
+    return asyncio.run(editor.execute(**kwargs))
+
+
+def test_undo_back_to_create_after_tab_expanding_edits(tmp_path):
+    path = tmp_path / "notes.txt"
+    created = "a\tb\nline2\nline3\n"
+    editor = StrReplaceEditor()
+
+    run(editor, command="create", path=str(path), file_text=created)
+    run(editor, command="str_replace", path=str(path), old_str="line2", new_str="two")
+    run(editor, command="insert", path=str(path), insert_line=1, new_str="first")
+    run(editor, command="insert", path=str(path), insert_line=4, new_str="last")
+
+    run(editor, command="undo_edit", path=str(path))
+    run(editor, command="undo_edit", path=str(path))
+    # Undoing the edit that expanded the tab restores the file as created
+    run(editor, command="undo_edit", path=str(path))
+    assert path.read_text() == created
+    run(editor, command="undo_edit", path=str(path))
+    assert path.read_text() == created
+
+    with pytest.raises(ToolError, match="No edit history"):
+        run(editor, command="undo_edit", path=str(path))
+
+
+def test_undo_restores_each_step(tmp_path):
+    path = tmp_path / "code.py"
+    editor = StrReplaceEditor()
+    run(editor, command="create", path=str(path), file_text="x = 1\ny = 2\n")
+    run(editor, command="str_replace", path=str(path), old_str="y = 2", new_str="y = 3")
+    run(editor, command="insert", path=str(path), insert_line=0, new_str="import os")
+
+    run(editor, command="undo_edit", path=str(path))
+    assert path.read_text() == "x = 1\ny = 3\n"
+    run(editor, command="undo_edit", path=str(path))
+    assert path.read_text() == "x = 1\ny = 2\n"